@@ -0,0 +1,177 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from shotcache import ShotCache
+from simulation import CUE, FPS
+
+# Scoring used to rank shots: the table's own score delta (100 / 500 / -50,
+# doubled in the golden pocket), with a heavy penalty for losing the game
+LOSS_PENALTY = 1000
+MIN_POWER, MAX_POWER = 0.1, 1.0
+
+# Search shape
+COARSE_ANGLES = 48
+COARSE_POWERS = (0.35, 0.6, 0.85)
+REFINE_TOP = 6          # Best shots carried into each refinement round
+REFINE_SAMPLES = 8      # New candidates drawn around each of them
+MAX_ROUNDS = 4
+MAX_CHUNK = 4           # Shots per worker task, small so results stream back early
+SHOT_FRAMES = 8 * FPS   # Simulated time budget per candidate
+CACHE_BYTES = 8 * 1024 * 1024   # Per worker process
+
+
+def score_outcome(outcome):
+    return outcome.score_delta - (LOSS_PENALTY if outcome.lost else 0)
+
+def _clamp_power(power):
+    return max(MIN_POWER, min(MAX_POWER, power))
+
+# Each worker keeps the outcomes it has simulated. Asking for a hint again on
+# the same layout repeats the same candidates, which then cost nothing.
+_cache = None
+
+# Runs in a worker process: rebuild the table for every candidate and play it out.
+# With samples > 1 each shot is replayed with a little aim/power noise and the
+# scores are averaged, so shots that only work when hit perfectly rank lower.
+def evaluate_shots(layout, shots, samples=1, seed=0):
+    global _cache
+    if _cache is None:
+        _cache = ShotCache(CACHE_BYTES)
+    rng = random.Random(seed)
+    results = []
+    for angle, power in shots:
+        total = 0
+        for k in range(samples):
+            a, p = angle, power
+            if k:
+                a += rng.gauss(0, 0.01)
+                p = _clamp_power(p + rng.gauss(0, 0.03))
+            total += score_outcome(_cache.simulate(layout, a, p, max_frames=SHOT_FRAMES))
+        results.append((total / samples, angle, power))
+    return results
+
+
+class ShotAdvisor:
+    """Monte Carlo shot search spread over a process pool.
+
+    start() kicks off a search for the current table and returns immediately;
+    poll() is cheap enough to call every frame and returns the best shot found
+    so far as (expected_score, angle, power), or None. Each round refines the
+    search around the best shots of the previous one. suggest() is the
+    blocking version for tools with a fixed time budget."""
+
+    def __init__(self, workers=None, samples=1):
+        self.workers = workers or os.cpu_count() or 1
+        self.samples = samples
+        self._pool = None
+        self._pending = set()
+        self._results = []
+        self._active = False
+        self.best = None
+        self.round = 0
+        self.layout = None
+
+    def _executor(self):
+        # Spawned (not forked) workers, so they never inherit the game's display
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def start(self, table):
+        self.cancel()
+        self.layout = table.layout()
+        self.best = None
+        self.round = 0
+        self._results = []
+        self._active = True
+        self._submit(self._coarse_candidates())
+
+    def cancel(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending = set()
+        self._active = False
+
+    @property
+    def searching(self):
+        return self._active
+
+    def poll(self):
+        done = {f for f in self._pending if f.done()}
+        self._collect(done)
+        return self.best
+
+    def suggest(self, table, budget=1.0):
+        deadline = time.monotonic() + budget
+        self.start(table)
+        while self._pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(self._pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        self.cancel()
+        return self.best
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _collect(self, done):
+        for future in done:
+            self._pending.discard(future)
+            if future.cancelled():
+                continue
+            for result in future.result():
+                self._results.append(result)
+                if self.best is None or result[0] > self.best[0]:
+                    self.best = result
+
+        # Round finished: refine around the best shots so far
+        if self._active and not self._pending:
+            if self._results and self.round < MAX_ROUNDS:
+                self.round += 1
+                self._submit(self._refined_candidates())
+            else:
+                self._active = False
+
+    def _submit(self, shots):
+        if not shots:
+            return
+        pool = self._executor()
+        # Enough chunks to keep every worker busy without pickling the layout per shot
+        chunk = max(1, min(MAX_CHUNK, math.ceil(len(shots) / (self.workers * 2))))
+        for i in range(0, len(shots), chunk):
+            seed = self.round * 100003 + i
+            self._pending.add(pool.submit(evaluate_shots, self.layout, shots[i:i + chunk], self.samples, seed))
+
+    def _coarse_candidates(self):
+        angles = [2 * math.pi * i / COARSE_ANGLES for i in range(COARSE_ANGLES)]
+
+        # Aiming straight at each object ball is usually worth a look
+        cue = next((pos for b_type, _, pos in self.layout["balls"] if b_type == CUE), None)
+        if cue is not None:
+            for b_type, _, (x, y) in self.layout["balls"]:
+                if b_type != CUE:
+                    angles.append(math.atan2(y - cue[1], x - cue[0]))
+
+        return [(a, p) for a in angles for p in COARSE_POWERS]
+
+    def _refined_candidates(self):
+        spread_angle = (2 * math.pi / COARSE_ANGLES) / (2 ** self.round)
+        spread_power = 0.25 / (2 ** self.round)
+        rng = random.Random(self.round)
+        top = sorted(self._results, reverse=True)[:REFINE_TOP]
+        shots = []
+        for _, angle, power in top:
+            for _ in range(REFINE_SAMPLES):
+                shots.append((angle + rng.uniform(-spread_angle, spread_angle),
+                              _clamp_power(power + rng.uniform(-spread_power, spread_power))))
+        return shots
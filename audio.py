@@ -0,0 +1,106 @@
+import collections
+import math
+import threading
+import time
+
+import pygame
+
+from simulation import L, R
+
+VOICES = 8                  # Channels reserved for sound effects
+SOURCE_INTERVAL = 0.1       # Seconds before the same ball can make the same sound again
+SOUND_FILES = {"ball": "ball_hit", "wall": "wall_hit", "cue": "cueballhit"}
+
+
+def load_sfx(name):
+    for ext in [".wav", ".mp3"]:
+        try:
+            return pygame.mixer.Sound(name + ext)
+        except (pygame.error, FileNotFoundError):
+            continue
+    return None
+
+# Equal power pan across the table: (left, right) channel volumes
+def pan(volume, x):
+    side = min(max((x - L) / (R - L), 0.0), 1.0)
+    return volume * math.cos(side * math.pi / 2), volume * math.sin(side * math.pi / 2)
+
+
+class SoundMixer:
+    """Plays sound effects from its own thread.
+
+    The game only appends requests to a deque (thread safe without a lock),
+    so the physics loop never waits on the audio device. The thread gives each
+    one a channel from a fixed pool, stealing the oldest when every voice is
+    busy, pans it by the ball's x position and drops repeats from the same
+    source within SOURCE_INTERVAL, so simultaneous hits no longer mute each
+    other the way one shared cooldown did. Requests made while the sounds are
+    still loading wait in the queue."""
+
+    def __init__(self, voices=VOICES, source_interval=SOURCE_INTERVAL):
+        # Decoded once, by the mixer thread, so startup doesn't wait on it
+        self.sounds = {}
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), voices))
+        self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+        self._started = [0.0] * voices
+        self.source_interval = source_interval
+        self._last_played = {}   # (source, sound) -> time
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sound-mixer", daemon=True)
+        self._thread.start()
+
+    # Queue a sound; source identifies what made it for rate limiting
+    def play(self, sound, volume, x=None, source=None):
+        self._queue.append((sound, volume, x, source))
+        self._wake.set()
+
+    # The (kind, impulse, x, body) impacts the table reported
+    def post_impacts(self, impacts):
+        for kind, impulse, x, body in impacts:
+            if kind == "wall":
+                self._queue.append(("wall", 0.5, x, body))
+            else:
+                # Dynamically set volume based on impact strength
+                self._queue.append(("ball", min(impulse / 1200, 1.0), x, body))
+        if impacts:
+            self._wake.set()
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        self.sounds = {key: load_sfx(name) for key, name in SOUND_FILES.items()}
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            while self._queue:
+                self._start(*self._queue.popleft())
+
+    def _start(self, sound_key, volume, x, source):
+        sound = self.sounds.get(sound_key)
+        if sound is None:
+            return
+        now = time.monotonic()
+        if source is not None:
+            key = (source, sound_key)
+            if now - self._last_played.get(key, -math.inf) < self.source_interval:
+                return
+            self._last_played[key] = now
+            if len(self._last_played) > 256:
+                self._last_played = {k: t for k, t in self._last_played.items() if now - t < self.source_interval}
+
+        # A free voice, or the one that has been playing the longest
+        free = [i for i, channel in enumerate(self.channels) if not channel.get_busy()]
+        voice = free[0] if free else min(range(len(self.channels)), key=self._started.__getitem__)
+        channel = self.channels[voice]
+        channel.play(sound)
+        # Playing resets the channel volume, so pan afterwards
+        if x is None:
+            channel.set_volume(volume)
+        else:
+            channel.set_volume(*pan(volume, x))
+        self._started[voice] = now
@@ -0,0 +1,307 @@
+import argparse
+import collections
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+
+from replay import Replay
+from simulation import Table, CUE, SOLID, STRIPE, POCKETS, MAX_SHOT_FRAMES
+
+HAZARDS = ("zones", "portals", "bumpers")
+MAX_SHOTS = 20          # Games still going after this many shots are called off
+POLICY_SEED = 0x5EED    # Mixed into the game seed so shot choice never touches the table's RNG
+CHUNK_GAMES = 16        # Most games a worker plays in lockstep per task
+CSV_FIELDS = ("seed", "hazards", "score", "won", "lost", "finished", "reason", "shots", "pots", "golden_pots",
+              *(f"pocket_{i}" for i in range(len(POCKETS))), "ticks", "sim_seconds")
+
+
+# Shot policies: (table, rng) -> (angle, power). They live at module level so
+# worker processes can look them up by name.
+def random_policy(table, rng):
+    return rng.uniform(-math.pi, math.pi), rng.uniform(0.3, 1.0)
+
+# Straight at a random object ball, with a little aim noise
+def aim_policy(table, rng):
+    cue = table.cue_ball.position
+    targets = [b.body.position for b in table.balls if b.ball_type != CUE]
+    if not targets:
+        return random_policy(table, rng)
+    x, y = rng.choice(targets)
+    return math.atan2(y - cue.y, x - cue.x) + rng.gauss(0, 0.02), rng.uniform(0.4, 0.9)
+
+POLICIES = {"random": random_policy, "aim": aim_policy}
+
+
+@dataclass
+class GameResult:
+    seed: int
+    settings: dict
+    score: int = 0
+    won: bool = False
+    lost: bool = False
+    finished: bool = False
+    reason: str = ""
+    ticks: int = 0
+    # (tick, angle, power) for every shot, exactly as a Replay records them
+    shots: list = field(default_factory=list)
+    # (ball_type, pocket_index) for every ball potted
+    pots: list = field(default_factory=list)
+    golden_pots: int = 0        # Object balls that went in the golden pocket
+    sim_seconds: float = 0.0    # Time spent simulating this game
+
+    def replay(self):
+        return Replay(self.seed, self.settings, self.shots)
+
+    def pocket_counts(self):
+        counts = [0] * len(POCKETS)
+        for _, p_idx in self.pots:
+            counts[p_idx] += 1
+        return counts
+
+    # Flat row for the CSV output
+    def row(self):
+        return {"seed": self.seed, "hazards": hazard_label(self.settings), "score": self.score, "won": self.won,
+                "lost": self.lost, "finished": self.finished, "reason": self.reason, "shots": len(self.shots),
+                "pots": len(self.pots), "golden_pots": self.golden_pots,
+                **{f"pocket_{i}": n for i, n in enumerate(self.pocket_counts())},
+                "ticks": self.ticks, "sim_seconds": round(self.sim_seconds, 6)}
+
+
+# Play whole games on a set of tables stepped in lockstep: every tick, each
+# table whose balls are at rest takes its next shot, then all of them advance
+# one tick. games is a list of (seed, settings).
+def play_games(games, policy="aim", max_shots=MAX_SHOTS, vectorized=False):
+    choose = POLICIES[policy]
+    tables, results, rngs = [], [], []
+    for seed, settings in games:
+        # Same setup as pressing PLAY, so every result can be replayed in the game
+        table = Table(**settings, seed=seed, vectorized=vectorized)
+        table.spawn_all()
+        tables.append(table)
+        results.append(GameResult(seed, dict(settings)))
+        rngs.append(random.Random(seed ^ POLICY_SEED))
+
+    active = list(range(len(tables)))
+    while active:
+        still_playing = []
+        for i in active:
+            table, result = tables[i], results[i]
+            start = time.perf_counter()
+            # A ball that never comes to rest (say, gaining speed through the
+            # ice every pass) would otherwise hold up every game after this one
+            stalled = table.in_motion and table.ticks - result.shots[-1][0] >= MAX_SHOT_FRAMES
+            if stalled or not table.in_motion and (table.game_over or len(result.shots) >= max_shots):
+                result.score, result.ticks = table.score, table.ticks
+                result.won, result.lost = table.game_won, table.lost
+                result.finished = table.game_over
+                result.reason = "STALLED" if stalled and not table.game_over else table.scratch_reason
+                continue
+            if not table.in_motion:
+                angle, power = choose(table, rngs[i])
+                result.shots.append((table.ticks, angle, power))
+                table.shoot(angle, power)
+            # The golden pocket moves when the turn ends, which can be this tick
+            golden = table.golden_pocket_index
+            pots = table.tick()
+            result.pots.extend(pots)
+            result.golden_pots += sum(p_idx == golden and b_type in (SOLID, STRIPE) for b_type, p_idx in pots)
+            result.sim_seconds += time.perf_counter() - start
+            still_playing.append(i)
+        active = still_playing
+    return results
+
+def summarize(results):
+    tally = Tally()
+    for result in results:
+        tally.add(result)
+    return tally.summary()
+
+# Running totals behind summarize(), so streamed results needn't be kept
+class Tally:
+    def __init__(self):
+        self.games = self.won = self.lost = self.unfinished = 0
+        self.score = self.shots = self.pots = self.golden_pots = self.ticks = 0
+        self.pockets = [0] * len(POCKETS)
+        self.reasons = collections.Counter()
+
+    def add(self, result):
+        self.games += 1
+        self.won += result.won
+        self.lost += result.lost
+        self.unfinished += not result.finished
+        self.score += result.score
+        self.shots += len(result.shots)
+        self.pots += len(result.pots)
+        self.golden_pots += result.golden_pots
+        self.ticks += result.ticks
+        for i, n in enumerate(result.pocket_counts()):
+            self.pockets[i] += n
+        if result.reason:
+            self.reasons[result.reason] += 1
+
+    def summary(self):
+        n = self.games or 1
+        return {
+            "games": self.games,
+            "win_rate": self.won / n,
+            "loss_rate": self.lost / n,
+            "unfinished": self.unfinished,
+            "mean_score": self.score / n,
+            "mean_shots": self.shots / n,
+            "mean_pots": self.pots / n,
+            "mean_golden_pots": self.golden_pots / n,
+            "mean_ticks": self.ticks / n,
+            "pots_by_pocket": self.pockets,
+            "scratch_reasons": dict(self.reasons),
+        }
+
+# Lists of up to size games from any iterable
+def chunked(games, size):
+    games = iter(games)
+    while chunk := list(itertools.islice(games, size)):
+        yield chunk
+
+
+class BatchSimulator:
+    """Runs many independent games and aggregates the results.
+
+    Games are split into chunks that are played in lockstep, either in this
+    process (workers=1) or across a pool of spawned worker processes. Every
+    game is fully determined by its seed and hazard settings."""
+
+    def __init__(self, workers=None, policy="aim", max_shots=MAX_SHOTS):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r} (one of {', '.join(POLICIES)})")
+        self.workers = workers or os.cpu_count() or 1
+        self.policy = policy
+        self.max_shots = max_shots
+
+    def run(self, games):
+        return list(self.stream(games))
+
+    # Results in the order of games, as soon as each chunk is done. games is
+    # read lazily and only a few chunks per worker are ever in flight, so
+    # memory stays flat however many games are played.
+    def stream(self, games, total=None):
+        # Small chunks keep every worker busy even when some games run long
+        if total is None and hasattr(games, "__len__"):
+            total = len(games)
+        chunk = CHUNK_GAMES
+        if total is not None:
+            chunk = max(1, min(chunk, math.ceil(total / (self.workers * 4))))
+        if self.workers == 1:
+            for games_chunk in chunked(games, chunk):
+                yield from play_games(games_chunk, self.policy, self.max_shots)
+            return
+
+        context = multiprocessing.get_context("spawn")
+        pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            try:
+                for games_chunk in chunked(games, chunk):
+                    pending.append(pool.submit(play_games, games_chunk, self.policy, self.max_shots))
+                    if len(pending) >= self.workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                # Stopped early: don't play what nobody will read
+                for future in pending:
+                    future.cancel()
+
+    # Every combination of hazards, `count` games each, summarized per combination
+    def sweep(self, count, seed=0):
+        combos = hazard_combos()
+        games = [(seed + i, settings) for settings in combos for i in range(count)]
+        results = self.run(games)
+        return results, {hazard_label(settings): summarize(results[k * count:(k + 1) * count])
+                         for k, settings in enumerate(combos)}
+
+def hazard_combos():
+    return [dict(zip(HAZARDS, bits)) for bits in itertools.product((False, True), repeat=len(HAZARDS))]
+
+def hazard_label(settings):
+    return "+".join(h for h in HAZARDS if settings.get(h)) or "none"
+
+
+# Writes each result as it arrives: one JSON object per line, or CSV rows
+class ResultWriter:
+    def __init__(self, file, fmt="jsonl"):
+        self.file = file
+        self.csv = csv.DictWriter(file, CSV_FIELDS) if fmt == "csv" else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv:
+            self.csv.writerow(result.row())
+        else:
+            record = dict(asdict(result), hazards=hazard_label(result.settings), pots_by_pocket=result.pocket_counts())
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+
+# Also reached as `python pool.py simulate`
+def cli(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Play many seeded games headlessly and aggregate the results.")
+    parser.add_argument("--games", type=int, default=100, help="games to play (per combination with --sweep)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; the rest count up from it")
+    parser.add_argument("--hazards", default=",".join(HAZARDS), help="comma separated, or 'none'")
+    parser.add_argument("--sweep", action="store_true", help="play every combination of hazards")
+    parser.add_argument("--policy", choices=list(POLICIES), default="aim")
+    parser.add_argument("--max-shots", type=int, default=MAX_SHOTS)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: one per core)")
+    parser.add_argument("--output", help="stream every game to this file as it finishes ('-' for stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="output format (default: csv for a .csv file, else JSON lines)")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        combos = hazard_combos()
+    else:
+        enabled = set(args.hazards.split(",")) - {"none", ""}
+        if enabled - set(HAZARDS):
+            parser.error(f"unknown hazards: {', '.join(sorted(enabled - set(HAZARDS)))}")
+        combos = [{h: h in enabled for h in HAZARDS}]
+    # Generated as the workers ask for them, never held in a list
+    games = ((args.seed + i, settings) for settings in combos for i in range(args.games))
+
+    fmt = args.format or ("csv" if args.output and args.output.endswith(".csv") else "jsonl")
+    if args.output == "-":
+        out = sys.stdout
+    elif args.output:
+        out = open(args.output, "w", newline="")
+    else:
+        out = None
+    # The summary goes to stderr when the games go to stdout
+    log = sys.stderr if out is sys.stdout else sys.stdout
+
+    simulator = BatchSimulator(args.workers or None, args.policy, args.max_shots)
+    writer = ResultWriter(out, fmt) if out else None
+    tallies = {hazard_label(settings): Tally() for settings in combos}
+    start = time.perf_counter()
+    try:
+        for result in simulator.stream(games, total=args.games * len(combos)):
+            tallies[hazard_label(result.settings)].add(result)
+            if writer:
+                writer.write(result)
+    finally:
+        if out not in (None, sys.stdout):
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    played = sum(tally.games for tally in tallies.values())
+    print(json.dumps({label: tally.summary() for label, tally in tallies.items()}, indent=2), file=log)
+    print(f"{played} games in {elapsed:.1f}s ({played / elapsed * 60:.0f} games/min)", file=log)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,216 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pymunk
+
+from profiling import PhaseTimer
+from simulation import Table, CHAOS_CONFIG, HAS_NUMPY, SUBSTEPS, CUE_START, L, R, T, B, BALL_RADIUS, BALL_COLORS, SOLID, STRIPE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Every scenario is seeded, so the same commit always simulates the same thing
+BREAK_ANGLE = 0.0
+BIG_TABLE_BALLS = 300
+
+
+# Scenarios
+# Each builder returns a table with the shot already taken
+def break_shot(vectorized):
+    table = Table(zones=False, portals=False, bumpers=False, track_impacts=True, vectorized=vectorized, seed=1)
+    table.shoot(BREAK_ANGLE, 1.0)
+    return table
+
+def dense_hazards(vectorized):
+    table = Table(track_impacts=True, vectorized=vectorized, seed=2)
+    table.spawn_all()
+    table.shoot(BREAK_ANGLE, 1.0)
+    return table
+
+def fast_forward(vectorized):
+    table = Table(track_impacts=True, vectorized=vectorized, seed=3)
+    table.spawn_all()
+    table.shoot(BREAK_ANGLE, 1.0)
+    return table
+
+def big_table(vectorized):
+    table = Table(track_impacts=True, vectorized=vectorized, rack=False, seed=4)
+    table.cue_ball, _ = table.add_ball(CUE_START, (255, 255, 255), 0)
+
+    # Grid of object balls filling the table, each with a random push
+    spacing = BALL_RADIUS * 2 + 5
+    cols = int((R - L - 4 * BALL_RADIUS) // spacing)
+    rng = table.rng
+    for i in range(BIG_TABLE_BALLS):
+        row, col = divmod(i, cols)
+        pos = (L + 2 * BALL_RADIUS + col * spacing, T + 2 * BALL_RADIUS + row * spacing)
+        if pos[1] > B - 2 * BALL_RADIUS:
+            break
+        ball_id = rng.choice(list(BALL_COLORS))
+        body, _ = table.add_ball(pos, BALL_COLORS[ball_id], SOLID if ball_id <= 7 else STRIPE)
+        angle = rng.uniform(0, 2 * math.pi)
+        body.velocity = pymunk.Vec2d(math.cos(angle), math.sin(angle)) * rng.uniform(100, 800)
+    table.spawn_all()
+    table.shoot(BREAK_ANGLE, 1.0)
+    return table
+
+# The chaos variant: a packed rack of 300 balls, 12 bumpers and 6 portal pairs
+def chaos(vectorized):
+    table = Table(track_impacts=True, vectorized=vectorized, seed=5, config=CHAOS_CONFIG)
+    table.spawn_all()
+    table.shoot(BREAK_ANGLE, 1.0)
+    return table
+
+# name: (builder, frames, substeps per frame)
+SCENARIOS = {
+    "break": (break_shot, 600, SUBSTEPS),
+    "dense_hazards": (dense_hazards, 600, SUBSTEPS),
+    "fast_forward": (fast_forward, 60, 50),
+    "big_table": (big_table, 60, SUBSTEPS),
+    "chaos": (chaos, 600, SUBSTEPS),
+}
+
+
+# Drawing cost, measured on a hidden display with the game's own sprites
+def make_drawer(table):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from pool import WIDTH, HEIGHT, build_ball_sprites
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    sprites = build_ball_sprites()
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill((0, 100, 0))
+    offset = (BALL_RADIUS, BALL_RADIUS)
+
+    def draw():
+        screen.blit(background, (0, 0))
+        screen.blits([(sprites.get((b.color, b.ball_type), sprites[((255, 255, 255), 0)]),
+                       (b.body.position.x - offset[0], b.body.position.y - offset[1]))
+                      for b in table.balls], doreturn=False)
+        pygame.display.flip()
+    return draw
+
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss # macOS reports bytes
+
+def run_scenario(name, vectorized, draw=False, trace_memory=False, adaptive=False):
+    builder, frames, substeps = SCENARIOS[name]
+    table = builder(vectorized)
+    table.adaptive = adaptive
+    table.timer = timer = PhaseTimer()
+    drawer = make_drawer(table) if draw else None
+    gc_before = [g["collections"] for g in gc.get_stats()]
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        if substeps == SUBSTEPS:
+            table.tick()
+        else:
+            table.step_frame(substeps)
+        if drawer:
+            timer.start()
+            drawer()
+            timer.lap("draw")
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "scenario": name,
+        "mode": ("vectorized" if vectorized else "python") + ("+adaptive" if adaptive else ""),
+        "balls": len(table.balls),
+        "frames": frames,
+        "substeps": table.substeps,
+        "seconds": elapsed,
+        "substeps_per_sec": table.substeps / elapsed if elapsed else 0.0,
+        "frames_per_sec": frames / elapsed if elapsed else 0.0,
+        "phases": timer.report(),
+        "impacts": len(table.impacts),   # Sound events the game would have played
+        "gc_collections": [g["collections"] - before for g, before in zip(gc.get_stats(), gc_before)],
+        "max_rss_kb": max_rss_kb(),
+        "tracemalloc_peak_bytes": peak,
+    }
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "pymunk": pymunk.version,
+        "numpy": HAS_NUMPY,
+        "machine": platform.machine(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def print_result(result):
+    print(f"{result['scenario']:>14} {result['mode']:>19}  {result['balls']:>4} balls  "
+          f"{result['substeps_per_sec']:>9.0f} substeps/s  {result['substeps']:>6} substeps  {result['seconds']:.2f}s")
+    total = sum(p["seconds"] for p in result["phases"].values()) or 1
+    for phase, p in sorted(result["phases"].items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{'':>16}{phase:>10} {p['seconds'] * 1000:9.1f} ms {100 * p['seconds'] / total:5.1f}%")
+
+# Speedup of every scenario/mode against an earlier --output file
+def print_comparison(results, old_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    before = {(r["scenario"], r["mode"]): r for r in old["results"]}
+    print(f"\nvs {old_path} ({old['meta'].get('commit')})")
+    for r in results:
+        prev = before.get((r["scenario"], r["mode"]))
+        if prev and prev["substeps_per_sec"]:
+            ratio = r["substeps_per_sec"] / prev["substeps_per_sec"]
+            print(f"{r['scenario']:>14} {r['mode']:>10}  {ratio:5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pool physics on fixed, seeded scenarios.")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--mode", choices=("python", "vectorized", "both"), default="both" if HAS_NUMPY else "python")
+    parser.add_argument("--draw", action="store_true", help="also time drawing the balls on a hidden display")
+    parser.add_argument("--memory", action="store_true", help="track the peak Python allocation (slower)")
+    parser.add_argument("--adaptive", action="store_true", help="also run every mode with adaptive substepping")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare against")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+
+    modes = {"python": [False], "vectorized": [True], "both": [False, True]}[args.mode]
+    results = []
+    for name in args.scenarios or SCENARIOS:
+        for vectorized in modes:
+            for adaptive in (False, True) if args.adaptive else (False,):
+                result = run_scenario(name, vectorized, draw=args.draw, trace_memory=args.memory, adaptive=adaptive)
+                print_result(result)
+                results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
@@ -0,0 +1,108 @@
+import datetime
+import json
+import os
+import queue
+import tempfile
+import threading
+
+SCORES_FILE = "highscores.json"
+LEGACY_FILE = "highscore.txt"   # Single number written by older versions
+LEADERBOARD_SIZE = 10
+
+_STOP = object()
+
+
+class ScoreBoard:
+    """Leaderboard kept in memory. The file is read once at startup and every
+    change is written by a background thread, atomically (temp file + rename),
+    so the game loop never waits on the disk and a killed process can't leave
+    a half-written file behind."""
+
+    def __init__(self, path=SCORES_FILE, legacy_path=LEGACY_FILE, size=LEADERBOARD_SIZE):
+        self.path = path
+        self.size = size
+        self.entries = self._load(legacy_path)
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def high_score(self):
+        return self.entries[0]["score"] if self.entries else 0
+
+    # Record (or update) a run. Pass the entry returned by the previous call
+    # for the same game so one game only ever holds one leaderboard slot.
+    def submit(self, score, seconds, hazards, entry=None):
+        if entry is None:
+            if score <= 0:
+                return None
+            entry = {"score": score, "time": seconds, "hazards": sorted(hazards),
+                     "date": datetime.date.today().isoformat()}
+            self.entries.append(entry)
+        elif score <= entry["score"]:
+            return entry # Keep the best score this game reached
+        else:
+            entry.update(score=score, time=seconds)
+
+        self.entries.sort(key=lambda e: (-e["score"], e["time"]))
+        del self.entries[self.size:]
+        self._save()
+        return entry if any(e is entry for e in self.entries) else None
+
+    # Wait for pending writes, e.g. on quit
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _load(self, legacy_path):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+        # Carry over the score from the old single-number file
+        try:
+            with open(legacy_path, "r") as f:
+                score = int(f.read())
+            return [{"score": score, "time": 0, "hazards": [], "date": ""}] if score > 0 else []
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="score-writer", daemon=True)
+            self._thread.start()
+        self._queue.put([dict(e) for e in self.entries])
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            data = None if stop else item
+            # Only the newest snapshot is worth writing
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stop = True
+                else:
+                    data = item
+            if data is not None:
+                self._write(data)
+            if stop:
+                return
+
+    def _write(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".scores-", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump({"entries": entries}, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving high score: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,64 @@
+CELL = 8    # px per grid cell
+
+
+class OccupancyGrid:
+    """Where a hazard's centre may go: the integer points in [left, right] x
+    [top, bottom], in square cells that are either free or blocked.
+
+    block() marks every cell a forbidden disc touches, so any point in a free
+    cell is clear of all of them. sample() picks a free cell uniformly and a
+    point inside it: one draw, never a retry, and None once nothing is free.
+    Blocking a disc around each hazard as it's placed spaces them out the way
+    Poisson disc sampling does."""
+
+    def __init__(self, left, top, right, bottom, cell=CELL):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+        self.cell = cell
+        self.cols = (right - left) // cell + 1 if right >= left else 0
+        self.rows = (bottom - top) // cell + 1 if bottom >= top else 0
+        self.cells = [bytearray(self.cols) for _ in range(self.rows)]  # 1 = blocked
+
+    # Block every cell with a point within radius of (x, y)
+    def block(self, x, y, radius):
+        cell, left, top, cols = self.cell, self.left, self.top, self.cols
+        first = max(int((y - radius - top) // cell), 0)
+        last = min(int((y + radius - top) // cell), self.rows - 1)
+        r2 = radius * radius
+        for j in range(first, last + 1):
+            # Nearest row of points in this band of cells
+            band_top = top + j * cell
+            dy = band_top - y if y < band_top else y - band_top - cell + 1
+            if dy <= 0:
+                reach = radius
+            elif dy < radius:
+                reach = (r2 - dy * dy) ** 0.5
+            else:
+                continue
+            i0 = int((x - reach - left) // cell)
+            i1 = int((x + reach - left) // cell)
+            if i0 < 0:
+                i0 = 0
+            if i1 >= cols:
+                i1 = cols - 1
+            if i0 <= i1:
+                self.cells[j][i0:i1 + 1] = b"\x01" * (i1 - i0 + 1)
+
+    def free_cells(self):
+        return sum(row.count(0) for row in self.cells)
+
+    def sample(self, rng):
+        k = self.free_cells()
+        if not k:
+            return None
+        k = rng.randrange(k)
+        for j, row in enumerate(self.cells):
+            free = row.count(0)
+            if k < free:
+                break
+            k -= free
+        i = row.index(0)
+        for _ in range(k):
+            i = row.index(0, i + 1)
+        x, y = self.left + i * self.cell, self.top + j * self.cell
+        return (rng.randint(x, min(x + self.cell - 1, self.right)),
+                rng.randint(y, min(y + self.cell - 1, self.bottom)))
@@ -0,0 +1,128 @@
+import math
+import threading
+
+from simulation import Table
+
+PREVIEW_TICKS = 90          # Lookahead per shot (1.5 s of play)
+PUBLISH_EVERY = 10          # Ticks between partial results, so the paths grow as they're computed
+ANGLE_THRESHOLD = 0.004     # Aim changes smaller than this (rad) keep the current preview
+POWER_THRESHOLD = 0.02
+WARP_JUMP = 60              # Moves longer than this in one tick are teleports; the path breaks there
+
+
+class TrajectoryPreview:
+    """Where the balls would go for the shot being aimed.
+
+    request() is cheap enough to call every frame: it only hands a new shot to
+    the worker thread when the aim or power moved past a threshold. The worker
+    restores its own table from a snapshot of the real one, plays the shot
+    forward (so bumpers, portals, walls and zones all count) and publishes
+    the paths every few ticks. paths holds
+    (ball_type, segments) for every ball that moves, each segment a list of
+    points, split wherever the ball warped."""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._job = None
+        self._generation = 0
+        self._stop = False
+        self._thread = None
+        self._base = None       # Snapshot of the table at rest
+        self._base_key = None
+        self._table = None      # The worker's table, restored for every shot
+        self.shot = None
+        self.paths = []
+        self.done = False
+
+    def request(self, table, angle, power):
+        # A snapshot of the table at rest, taken once per layout
+        key = (table.seed, table.turn, tuple(table.cue_ball.position), tuple(table.portals),
+               table.ice_zone, table.mud_zone,
+               tuple(tuple(b.body.position) for b in table.bumpers))
+        relayout = key != self._base_key
+        if relayout:
+            self._base, self._base_key = table.snapshot(), key
+        elif self.shot is not None:
+            turned = abs(math.remainder(angle - self.shot[0], 2 * math.pi))
+            if turned < ANGLE_THRESHOLD and abs(power - self.shot[1]) < POWER_THRESHOLD:
+                return
+
+        with self._lock:
+            self._generation += 1
+            self._job = (self._generation, self._base, angle, power)
+            self.shot = (angle, power)
+            self.done = False
+            # Paths for the same layout stay up until the new ones arrive
+            if relayout:
+                self.paths = []
+            self._lock.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="trajectory-preview", daemon=True)
+            self._thread.start()
+
+    # Drop the preview, e.g. once the shot is taken
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._job = None
+            self.shot = None
+            self.paths = []
+            self.done = False
+
+    def shutdown(self):
+        with self._lock:
+            self._stop = True
+            self._generation += 1
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while self._job is None and not self._stop:
+                    self._lock.wait()
+                if self._stop:
+                    return
+                job, self._job = self._job, None
+            self._simulate(*job)
+
+    def _simulate(self, generation, base, angle, power):
+        if self._table is None or self._table.config != base.config:
+            self._table = Table.from_snapshot(base)
+        else:
+            self._table.restore(base)
+        table = self._table
+        table.shoot(angle, power)
+        types = {ball.body: ball.ball_type for ball in table.balls}
+        tracks = {body: [[tuple(body.position)]] for body in types}
+
+        for tick in range(1, PREVIEW_TICKS + 1):
+            # A newer shot was requested: this one is no longer worth finishing
+            if generation != self._generation:
+                return
+            table.step_frame()
+            for body, segments in tracks.items():
+                if body.space is None:
+                    continue # Potted
+                pos = tuple(body.position)
+                last = segments[-1][-1]
+                if pos == last:
+                    continue
+                if math.dist(pos, last) > WARP_JUMP:
+                    segments.append([pos])
+                else:
+                    segments[-1].append(pos)
+
+            stopped = table.balls_stopped()
+            if stopped or tick % PUBLISH_EVERY == 0 or tick == PREVIEW_TICKS:
+                paths = [(types[body], [list(seg) for seg in segments])
+                         for body, segments in tracks.items() if len(segments) > 1 or len(segments[0]) > 1]
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    self.paths = paths
+                    self.done = stopped or tick == PREVIEW_TICKS
+                if stopped:
+                    return
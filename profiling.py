@@ -0,0 +1,117 @@
+import collections
+import json
+import time
+
+
+class PhaseTimer:
+    """Lap timer for the simulation's phases.
+
+    Call start() where timing should begin, then lap(name) after each phase:
+    the time since the previous start()/lap() is charged to that phase. Table
+    calls these itself when its `timer` attribute is set."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.totals = {}
+        self.calls = {}
+        self._last = clock()
+
+    def start(self):
+        self._last = self.clock()
+
+    def lap(self, name):
+        now = self.clock()
+        self.totals[name] = self.totals.get(name, 0.0) + (now - self._last)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self._last = now
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+        self._last = self.clock()
+
+    def report(self):
+        return {name: {"seconds": seconds, "calls": self.calls[name]}
+                for name, seconds in self.totals.items()}
+
+
+class FrameProfiler(PhaseTimer):
+    """PhaseTimer for the game loop that also keeps every frame's phase times
+    for rolling percentiles, and can stream each lap to a Chrome trace file
+    (open it in chrome://tracing or ui.perfetto.dev).
+
+    Set it as the table's timer as well and the physics phases show up next
+    to the game's own. Call end_frame() once per rendered frame."""
+
+    def __init__(self, window=240, clock=time.perf_counter):
+        super().__init__(clock)
+        self.window = window
+        self.samples = {}   # phase -> deque of per-frame seconds
+        self.frame = {}
+        self._frame_start = self._last
+        self._trace = None
+        self._trace_start = 0.0
+        self._trace_first = True
+
+    def lap(self, name):
+        start = self._last
+        super().lap(name)
+        seconds = self._last - start
+        self.frame[name] = self.frame.get(name, 0.0) + seconds
+        if self._trace:
+            self._write_event(name, start, seconds, tid=0)
+
+    # Also forgets the rolling window, e.g. after the profiler was switched off
+    def reset(self):
+        super().reset()
+        self.samples.clear()
+        self.frame = {}
+        self._frame_start = self._last
+
+    def end_frame(self):
+        now = self.clock()
+        self.frame["frame"] = now - self._frame_start
+        if self._trace:
+            self._write_event("frame", self._frame_start, now - self._frame_start, tid=1)
+        for name in self.frame.keys() - self.samples.keys():
+            self.samples[name] = collections.deque(maxlen=self.window)
+        # Phases that didn't run this frame took no time in it
+        for name, samples in self.samples.items():
+            samples.append(self.frame.get(name, 0.0))
+        self.frame = {}
+        self._frame_start = self._last = now
+
+    # (p50, p95, p99) of a phase's per-frame time over the window, in seconds
+    def percentiles(self, name, points=(50, 95, 99)):
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return tuple(0.0 for _ in points)
+        return tuple(values[min(len(values) - 1, len(values) * p // 100)] for p in points)
+
+    # Chrome trace export
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    def start_trace(self, path):
+        self.stop_trace()
+        self._trace = open(path, "w")
+        self._trace.write("[")
+        self._trace_start = self.clock()
+        self._trace_first = True
+        for tid, thread in enumerate(("phases", "frames")):
+            self._write({"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": thread}})
+
+    def stop_trace(self):
+        if self._trace:
+            self._trace.write("\n]\n")
+            self._trace.close()
+            self._trace = None
+
+    def _write_event(self, name, start, seconds, tid):
+        self._write({"name": name, "ph": "X", "pid": 0, "tid": tid,
+                     "ts": (start - self._trace_start) * 1e6, "dur": seconds * 1e6})
+
+    def _write(self, event):
+        self._trace.write(("\n" if self._trace_first else ",\n") + json.dumps(event))
+        self._trace_first = False
@@ -0,0 +1,139 @@
+import json
+import struct
+from dataclasses import asdict
+
+from simulation import Table, TableConfig, MAX_SHOT_FRAMES
+
+# Binary layout (little endian):
+#   header: magic, version, hazard bits, seed, shot count
+#   shots:  tick the shot was taken on, angle, power
+#   config: only with CONFIG_BIT set, the table config as length prefixed JSON
+MAGIC = b"PRPL"
+VERSION = 4     # 2: pots detected every substep, 3: resting balls sleep, 4: hazards placed from an occupancy grid; older games play out differently
+HEADER = struct.Struct("<4sBBQI")
+SHOT = struct.Struct("<Idd")
+CONFIG_LENGTH = struct.Struct("<I")
+HAZARD_BITS = {"zones": 1, "portals": 2, "bumpers": 4}
+CONFIG_BIT = 8      # Anything but the standard table
+
+CHECKPOINT_EVERY = 5    # Shots between saved table snapshots when seeking
+
+
+class Replay:
+    """A whole game as its seed, hazard settings, table config and the shots taken.
+
+    The table is deterministic, so this is enough to re-simulate the game
+    headlessly. Seeking keeps a snapshot of the table every few shots and
+    plays forward from the nearest one. Restoring a snapshot starts a fresh
+    pymunk space, which the game itself never does, so a seek can drift from
+    the original game; play() always starts from the beginning."""
+
+    def __init__(self, seed, settings, shots=None, config=None):
+        self.seed = seed
+        self.settings = dict(settings)
+        self.shots = list(shots or [])  # (tick, angle, power)
+        self.config = config or TableConfig()
+        self._checkpoints = {}
+
+    @classmethod
+    def for_table(cls, table):
+        return cls(table.seed, table.settings, config=table.config)
+
+    def record(self, tick, angle, power):
+        self.shots.append((tick, angle, power))
+        self._checkpoints.clear()
+
+    # Serialization
+    def to_bytes(self):
+        bits = sum(bit for key, bit in HAZARD_BITS.items() if self.settings.get(key))
+        config = b""
+        if self.config != TableConfig():
+            bits |= CONFIG_BIT
+            data = json.dumps(asdict(self.config)).encode()
+            config = CONFIG_LENGTH.pack(len(data)) + data
+        header = HEADER.pack(MAGIC, VERSION, bits, self.seed, len(self.shots))
+        return header + b"".join(SHOT.pack(*shot) for shot in self.shots) + config
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, bits, seed, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a pool replay (or an unsupported version)")
+        settings = {key: bool(bits & bit) for key, bit in HAZARD_BITS.items()}
+        shots = [SHOT.unpack_from(data, HEADER.size + i * SHOT.size) for i in range(count)]
+        config = None
+        if bits & CONFIG_BIT:
+            offset = HEADER.size + count * SHOT.size
+            length, = CONFIG_LENGTH.unpack_from(data, offset)
+            start = offset + CONFIG_LENGTH.size
+            config = TableConfig(**json.loads(data[start:start + length]))
+        return cls(seed, settings, shots, config)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    # Playback
+    # The table exactly as the game starts it: seeded rack, then the hazards
+    # spawned when PLAY is pressed
+    def new_table(self, **kwargs):
+        table = Table(**self.settings, seed=self.seed, config=self.config, **kwargs)
+        table.spawn_all()
+        return table
+
+    # Play the next shot: idle ticks up to the tick it was taken on, then shoot
+    def _take_shot(self, table, index):
+        tick, angle, power = self.shots[index]
+        while table.ticks < tick:
+            table.tick()
+        table.shoot(angle, power)
+
+    # Re-simulate the whole game uncapped and return the final table
+    def play(self, **kwargs):
+        return self._play(0, len(self.shots), **kwargs)
+
+    # Table as it was just before shot `index` was taken (len(shots) plays the
+    # game to the end). Checkpoints are filled in along the way.
+    def seek(self, index, **kwargs):
+        index = max(0, min(index, len(self.shots)))
+        start = max((i for i in self._checkpoints if i <= index), default=0)
+        return self._play(start, index, **kwargs)
+
+    # From the checkpoint at shot `start` (0 is a new table) up to shot `index`
+    def _play(self, start, index, **kwargs):
+        if not start:
+            table = self.new_table(**kwargs)
+        else:
+            table = Table.from_snapshot(self._checkpoints[start], **kwargs)
+
+        for i in range(start, index):
+            self._take_shot(table, i)
+            # Called off after as many ticks as batch games allow a shot
+            while table.in_motion and table.ticks < self.shots[i][0] + MAX_SHOT_FRAMES:
+                table.tick()
+            if (i + 1) % CHECKPOINT_EVERY == 0 and i + 1 not in self._checkpoints:
+                self._checkpoints[i + 1] = table.snapshot()
+
+        # Before shot `index`, the game had idled up to its tick
+        if index < len(self.shots):
+            while table.ticks < self.shots[index][0]:
+                table.tick()
+        return table
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Re-simulate a saved game as fast as possible: python replay.py last_game.rpl
+    replay = Replay.load(sys.argv[1] if len(sys.argv) > 1 else "last_game.rpl")
+    start = time.perf_counter()
+    table = replay.play()
+    elapsed = time.perf_counter() - start
+    print(f"seed {replay.seed}, {len(replay.shots)} shots, {table.ticks} ticks in {elapsed:.2f}s")
+    print(f"score {table.score}, turn {table.turn}, game over: {table.game_over} {table.scratch_reason}")
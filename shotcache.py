@@ -0,0 +1,146 @@
+import collections
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict
+
+from simulation import Table, ShotOutcome, FPS
+
+# Bump when a physics change makes old outcomes wrong; saved caches with
+# another version are ignored
+CACHE_VERSION = 4
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Quantization steps. The shot is simulated from the quantized state, so an
+# outcome is exact for its key rather than an approximation of a nearby shot.
+POSITION_STEP = 0.01    # px
+ANGLE_STEP = 1e-4       # rad
+POWER_STEP = 1e-3
+
+
+def _q(value, step):
+    return round(value / step)
+
+def quantize_layout(layout):
+    return dict(layout, balls=[(b_type, color, (_q(x, POSITION_STEP) * POSITION_STEP, _q(y, POSITION_STEP) * POSITION_STEP))
+                               for b_type, color, (x, y) in layout["balls"]])
+
+# Everything about the table that decides how a shot plays out: the config,
+# the balls in space order (the order matters to pymunk), hazards and golden
+# pocket. The score and the ball colours don't change the outcome, so they
+# are left out.
+def layout_state(layout):
+    return (
+        sorted(layout["config"].items()),
+        sorted(layout["settings"].items()),
+        [(b_type, _q(x, POSITION_STEP), _q(y, POSITION_STEP)) for b_type, _, (x, y) in layout["balls"]],
+        [(_q(x, POSITION_STEP), _q(y, POSITION_STEP)) for x, y in layout["bumpers"]],
+        [tuple(_q(v, POSITION_STEP) for v in (*a, *b)) for a, b in layout["portals"]],
+        layout["zones"],
+        layout["golden_pocket_index"],
+    )
+
+def shot_key(layout, angle, power, max_frames):
+    state = (*layout_state(layout), _q(angle, ANGLE_STEP), _q(power, POWER_STEP), max_frames)
+    return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+
+class ShotCache:
+    """LRU cache of simulated shot outcomes, keyed by the quantized table
+    layout plus the quantized shot.
+
+    The physics is deterministic, so asking about the same shot from the same
+    layout again costs a dict lookup. Entries are evicted least recently used
+    first once their estimated size passes max_bytes. With a path the cache is
+    loaded from disk on creation and written back (atomically) by save().
+    Misses on the same layout share one table, restored from a snapshot for
+    each shot instead of being rebuilt."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = collections.OrderedDict()   # key -> (outcome, size)
+        self.size = 0
+        self.hits = self.misses = 0
+        self._table = self._snapshot = self._layout_state = None
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def simulate(self, layout, angle, power, max_frames=60 * FPS):
+        key = shot_key(layout, angle, power, max_frames)
+        outcome = self.get(key)
+        if outcome is None:
+            table = self._table_for(layout)
+            outcome = table.simulate_shot(_q(angle, ANGLE_STEP) * ANGLE_STEP, _q(power, POWER_STEP) * POWER_STEP,
+                                          max_frames=max_frames)
+            self.put(key, outcome)
+        return outcome
+
+    # A table at the start of the shot. Restoring plays out exactly like a table
+    # fresh from from_layout() would.
+    def _table_for(self, layout):
+        state = layout_state(layout)
+        if state != self._layout_state:
+            self._table = Table.from_layout(quantize_layout(layout))
+            self._snapshot, self._layout_state = self._table.snapshot(), state
+        else:
+            self._table.restore(self._snapshot)
+        return self._table
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, outcome):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        # Rough footprint: the JSON it would be saved as
+        size = len(key) + len(json.dumps(asdict(outcome)))
+        self.entries[key] = (outcome, size)
+        self.size += size
+        while self.size > self.max_bytes and self.entries:
+            self.size -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    # Persistence: oldest first, so loading restores the LRU order
+    def save(self):
+        if not self.path:
+            return
+        data = {"version": CACHE_VERSION,
+                "entries": [[key, asdict(outcome)] for key, (outcome, _) in self.entries.items()]}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".shots-", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving shot cache: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        for key, fields in data.get("entries", []):
+            fields["pots"] = [tuple(p) for p in fields["pots"]]
+            fields["final_positions"] = [tuple(p) for p in fields["final_positions"]]
+            self.put(key, ShotOutcome(**fields))
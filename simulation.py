@@ -0,0 +1,1252 @@
+import importlib.util
+import math
+import random
+from array import array
+from dataclasses import dataclass, field, asdict
+
+import pymunk
+import pymunk.batch
+
+from placement import OccupancyGrid
+
+# NumPy is optional; it is only needed for the vectorized physics passes, and
+# only imported by the first vectorized table (it is most of a worker's startup)
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+# Physics Configuration
+FPS = 60
+MAX_SHOT_FRAMES = 60 * FPS   # A shot still rolling after this long is called off
+BALL_RADIUS = 15
+L, R = 50, 1150
+T, B = 50, 600
+FRICTION = 0.98
+CX, CY = (L + R) // 2, (T + B) // 2
+POCKET_RADIUS = 40              # Balls this close to a pocket's centre are pulled in and potted
+PORTAL_RADIUS = 25              # Balls this close to a portal's centre warp through it
+CUE_START = (300, CY)
+RACK_SPOT = (800, CY)           # Apex of the triangle rack
+WALL_THICKNESS = 20
+SUBSTEPS = 5                    # Substeps per frame
+# Adaptive mode: each frame gets as many substeps as its fastest ball needs to
+# move at most ADAPTIVE_TRAVEL per substep, and none once every ball sleeps.
+# Balls moving further than SWEEP_TRAVEL in a substep are traced along their
+# path, so they can't hop over a pocket or portal between two substeps.
+ADAPTIVE_TRAVEL = BALL_RADIUS / 3
+ADAPTIVE_MAX_SUBSTEPS = 20
+SWEEP_TRAVEL = BALL_RADIUS / 4
+STOP_SPEED = 13                 # Balls slower than this are stopped dead by the friction pass
+MAX_SPEED = 3000                # Velocity clamp
+FRAME_DAMPING = math.pow(FRICTION, 1/5)
+SLEEP_TIME = 1 / FPS            # pymunk puts balls to sleep after resting this long
+
+# Collision types, used to route contacts to the impact and pocket handlers
+BALL_COLLISION = 1
+WALL_COLLISION = 2
+POCKET_COLLISION = 3
+PORTAL_COLLISION = 4
+
+# Pockets and portals are sensors in their own categories; queries for solid things skip them
+POCKET_CATEGORY = 0b1000
+PORTAL_CATEGORY = 0b10000
+SOLID_FILTER = pymunk.ShapeFilter(mask=pymunk.ShapeFilter.ALL_MASKS() ^ (POCKET_CATEGORY | PORTAL_CATEGORY))
+SENSOR_FILTER = pymunk.ShapeFilter(mask=POCKET_CATEGORY | PORTAL_CATEGORY)
+
+# Hazard placement: centre distances kept when there's room (spaced), and the
+# smallest that still keep hazards apart on a packed table. A hazard that fits
+# neither way is left out. Spaced bumpers stay 60 px from the surface of
+# anything solid; walls reach 10 px into the table.
+BUMPER_SPACED = {"margin": 70, "ball_gap": 75, "bumper_gap": 85}
+BUMPER_PACKED = {"margin": 35, "ball_gap": 40, "bumper_gap": 50}
+PORTAL_SPACED = {"margin": 80, "ball_gap": 120, "bumper_gap": 100, "pocket_gap": 100, "portal_gap": 100}
+PORTAL_PACKED = {"margin": 40, "ball_gap": 40, "bumper_gap": 50, "pocket_gap": 65, "portal_gap": 50}
+
+# Minimum contact impulse that counts as an audible hit (balls have mass 1, so
+# these are roughly a 150 px/s ball-ball and 200 px/s ball-wall impact)
+IMPACT_THRESHOLDS = {"ball": 120, "wall": 330}
+
+# Ball Types
+# 0: Cue, 1: Solid, 2: Stripe, 3: Black
+CUE, SOLID, STRIPE, BLACK = 0, 1, 2, 3
+
+# Color Map
+BALL_COLORS = {
+    1: (255, 215, 0),  2: (0, 0, 255),    3: (255, 0, 0),
+    4: (128, 0, 128),  5: (255, 165, 0),  6: (0, 128, 0),
+    7: (128, 0, 0),    8: (10, 10, 10),   # 8 is Black
+    9: (255, 215, 0),  10: (0, 0, 255),   11: (255, 0, 0),
+    12: (128, 0, 128), 13: (255, 165, 0), 14: (0, 128, 0),
+    15: (128, 0, 0)
+}
+
+# Wall segments, offset so the inner edge lines up with the table bounds
+def wall_segments(left, top, right, bottom):
+    offset = WALL_THICKNESS / 2
+    return [
+        ((left, top - offset), (right, top - offset)),          # Top
+        ((right + offset, top), (right + offset, bottom)),      # Right
+        ((right, bottom + offset), (left, bottom + offset)),    # Bottom
+        ((left - offset, bottom), (left - offset, top))         # Left
+    ]
+
+# Corners and middles of the long rails
+def rail_pockets(left, top, right, bottom):
+    mid = (left + right) // 2
+    return [
+        (left, top), (mid, top), (right, top),          # Top rail
+        (left, bottom), (mid, bottom), (right, bottom)  # Bottom rail
+    ]
+
+WALLS = wall_segments(L, T, R, B)
+POCKETS = rail_pockets(L, T, R, B)
+
+NO_ZONE = (0, 0, 0, 0)
+# Below this many awake balls the vectorized passes cost more than the plain
+# ones (which they match bit for bit), so a vectorized table uses those
+VECTORIZED_MIN_BALLS = 32
+# What the vectorized passes copy out of pymunk per body, in one call
+ZONE_FIELDS = pymunk.batch.BodyFields.BODY_ID | pymunk.batch.BodyFields.POSITION | pymunk.batch.BodyFields.VELOCITY
+FRICTION_FIELDS = pymunk.batch.BodyFields.BODY_ID | pymunk.batch.BodyFields.VELOCITY | pymunk.batch.BodyFields.ANGULAR_VELOCITY
+RACK_SHAPES = ("triangle", "grid")
+
+
+# A ball's game data, next to its pymunk objects rather than stuck on them
+# as extra attributes (every one of those goes through pymunk's __setattr__)
+class Ball:
+    __slots__ = ("body", "shape", "ball_type", "color")
+
+    def __init__(self, body, shape, ball_type, color):
+        self.body = body
+        self.shape = shape
+        self.ball_type = ball_type
+        self.color = color
+
+
+class BallRegistry:
+    """The balls in play in the order they were added to the space, their
+    bodies in a parallel list for the hot loops, and a running count per ball
+    type, so the rules never scan the table to see what's left."""
+
+    def __init__(self):
+        self.balls = []
+        self.bodies = []
+        self.counts = [0] * 4       # Indexed by ball type
+        self.by_id = {}             # Body id (as pymunk.batch reports it) -> body
+        self._by_shape = {}
+
+    def __len__(self):
+        return len(self.balls)
+
+    def __iter__(self):
+        return iter(self.balls)
+
+    def add(self, ball):
+        self.balls.append(ball)
+        self.bodies.append(ball.body)
+        self.counts[ball.ball_type] += 1
+        self.by_id[ball.body.id] = ball.body
+        self._by_shape[ball.shape] = ball
+
+    def remove(self, ball):
+        self.balls.remove(ball)
+        self.bodies.remove(ball.body)
+        self.counts[ball.ball_type] -= 1
+        del self.by_id[ball.body.id]
+        del self._by_shape[ball.shape]
+
+    def clear(self):
+        self.balls, self.bodies = [], []
+        self.counts = [0] * 4
+        self.by_id = {}
+        self._by_shape = {}
+
+    # The ball a shape belongs to
+    def of(self, shape):
+        return self._by_shape[shape]
+
+    def count(self, *ball_types):
+        return sum(self.counts[t] for t in ball_types)
+
+
+def create_pool_ball(space, pos, color, ball_type):
+    body, shape = create_ball(space, pos)
+    return Ball(body, shape, ball_type, color)
+
+# Basic function for creating balls; with space=None the ball isn't added yet
+def create_ball(space, pos):
+    mass = 1
+    moment = pymunk.moment_for_circle(mass, 0, BALL_RADIUS)
+    body = pymunk.Body(mass, moment)
+    body.position = pos
+    shape = pymunk.Circle(body, BALL_RADIUS)
+    shape.elasticity = 0.8
+    shape.friction = 0.5
+    shape.filter = pymunk.ShapeFilter(categories=0b10)
+    shape.collision_type = BALL_COLLISION
+    if space is not None:
+        space.add(body, shape)
+    return body, shape # Return both so we can track the cue shape
+
+# Zones are plain (x, y, w, h) tuples so the physics never needs pygame.
+# These follow pygame.Rect semantics so the drawn zone matches the hit area.
+def rect_contains(rect, x, y):
+    rx, ry, rw, rh = rect
+    return rx <= x < rx + rw and ry <= y < ry + rh
+
+def rects_overlap(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    if not (aw and ah and bw and bh):
+        return False
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+@dataclass
+class TableConfig:
+    """Size and contents of a table; the defaults are the standard game.
+    Pockets are (x, y, radius), the six rail pockets unless given. balls
+    counts the object balls, the 8-ball included, and portals counts pairs."""
+    left: int = L
+    top: int = T
+    right: int = R
+    bottom: int = B
+    pockets: list = field(default_factory=list)
+    cue_start: tuple = CUE_START
+    rack: str = "triangle"      # "triangle" from rack_spot, or "grid" packed in from the right rail
+    rack_spot: tuple = RACK_SPOT
+    balls: int = 15
+    bumpers: int = 2
+    portals: int = 1
+
+    def __post_init__(self):
+        if self.rack not in RACK_SHAPES:
+            raise ValueError(f"unknown rack shape {self.rack!r} (one of {', '.join(RACK_SHAPES)})")
+        if self.balls < 1:
+            raise ValueError("the rack needs at least the 8-ball")
+        if not self.pockets:
+            self.pockets = [(x, y, POCKET_RADIUS) for x, y in rail_pockets(self.left, self.top, self.right, self.bottom)]
+        # Lists when read back from a layout or JSON
+        self.pockets = [tuple(p) for p in self.pockets]
+        self.cue_start, self.rack_spot = tuple(self.cue_start), tuple(self.rack_spot)
+
+        for x, y, radius in self.pockets:
+            if radius <= BALL_RADIUS:
+                raise ValueError(f"pocket at ({x}, {y}) is too small for a ball (radius {radius} <= {BALL_RADIUS})")
+        # Every ball of the rack has to start on the cloth
+        placed = 0
+        for x, y in self.rack_spots():
+            if placed == self.balls:
+                break
+            if not (self.left + BALL_RADIUS <= x <= self.right - BALL_RADIUS
+                    and self.top + BALL_RADIUS <= y <= self.bottom - BALL_RADIUS):
+                raise ValueError(f"a {self.rack} rack of {self.balls} balls runs off the table")
+            placed += 1
+        if placed < self.balls:
+            raise ValueError(f"a {self.rack} rack of {self.balls} balls doesn't fit the table (room for {placed})")
+
+    def walls(self):
+        return wall_segments(self.left, self.top, self.right, self.bottom)
+
+    # Where the rack's balls go, in order
+    def rack_spots(self):
+        return self._triangle_spots() if self.rack == "triangle" else self._grid_spots()
+
+    # Columns of a triangle growing away from the apex, as many as it takes
+    def _triangle_spots(self):
+        start_x, start_y = self.rack_spot
+        col = 0
+        while True:
+            for row in range(col + 1):
+                yield (start_x + (col * (BALL_RADIUS * 2 - 1)),
+                       start_y + (row * (BALL_RADIUS * 2 + 1)) - (col * BALL_RADIUS))
+            col += 1
+
+    # Columns packed from the right rail toward the cue, skipping the pockets
+    def _grid_spots(self):
+        spacing = BALL_RADIUS * 2 + 1
+        rows = int((self.bottom - self.top - 2) // spacing)
+        x = self.right - BALL_RADIUS - 1
+        while x > self.left + BALL_RADIUS:
+            for row in range(rows):
+                y = self.top + BALL_RADIUS + 1 + row * spacing
+                if all((x - px) ** 2 + (y - py) ** 2 >= (radius + BALL_RADIUS) ** 2 for px, py, radius in self.pockets):
+                    yield x, y
+            x -= spacing
+
+# The big chaos variant: a packed rack and many more hazards on the usual table
+CHAOS_CONFIG = TableConfig(rack="grid", balls=300, bumpers=12, portals=6)
+
+
+# Per ball in a snapshot: position, velocity, angle, spin, pending force and torque
+BALL_FIELDS = 9
+
+@dataclass
+class TableSnapshot:
+    """Everything that decides how a table plays on, packed into flat arrays:
+    BALL_FIELDS floats per ball in space order, (x, y) per bumper, (ax, ay,
+    bx, by) per portal pair and (ball index, substeps) per warp cooldown.
+    Holds no pymunk objects, so it is cheap to keep and to pickle."""
+    seed: int
+    settings: dict
+    config: TableConfig
+    balls: array
+    ball_types: array
+    colors: tuple
+    bumpers: array
+    portals: array
+    cooldowns: array
+    zones: tuple
+    golden_pocket_index: int
+    score: int
+    game_over: bool
+    lost: bool
+    game_won: bool
+    scratch_reason: str
+    first_turn: bool
+    ticks: int
+    turn: int
+    in_motion: bool
+    rng_state: tuple
+
+
+@dataclass
+class ShotOutcome:
+    # (ball_type, pocket_index) for every ball potted during the shot
+    pots: list = field(default_factory=list)
+    score_delta: int = 0
+    scratch: bool = False
+    game_over: bool = False
+    lost: bool = False
+    game_won: bool = False
+    scratch_reason: str = ""
+    frames: int = 0
+    # (ball_type, x, y) for every ball left on the table
+    final_positions: list = field(default_factory=list)
+
+
+class Table:
+    """Headless pool table: owns the space, the rack, the hazards and the
+    per-substep rules. Nothing in here touches the display or the clock."""
+
+    def __init__(self, zones=True, portals=True, bumpers=True, track_impacts=False, vectorized=False, rack=True, seed=None,
+                 config=None, adaptive=False):
+        # Dimensions, pockets, rack and hazard counts
+        self.config = config or TableConfig()
+        self.settings = {
+            "zones": zones,
+            "portals": portals,
+            "bumpers": bumpers
+        }
+        # When set, the space records ("ball" | "wall", impulse, x, ball body) impacts for the sound code
+        self.track_impacts = track_impacts
+        # When set, the per-substep passes run as batched NumPy array ops
+        if vectorized:
+            if not HAS_NUMPY:
+                raise ImportError("vectorized mode needs numpy (pip install numpy)")
+            global np
+            import numpy as np
+        self.vectorized = vectorized
+        self._batch = pymunk.batch.Buffer() if vectorized else None   # Reused by the vectorized passes
+        self._zone_bounds = (None, None, None)  # (zones, low corners, high corners)
+        # When set, step_frame() picks the substep count from the fastest ball
+        self.adaptive = adaptive
+        self.substeps = 0       # Physics substeps run, for comparing the two modes
+        # Optional profiling.PhaseTimer; when set, every phase reports a lap to it
+        self.timer = None
+        self.reset(rack, seed)
+
+    # Build a fresh space with walls, clear hazards and rack the balls.
+    # All randomness (rack order, hazards, golden pocket) comes from self.rng,
+    # so the same seed and the same shots always play out the same game.
+    def reset(self, rack=True, seed=None):
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+
+        self.space = self._new_space()
+
+        # Walls, pockets and portals hang off a static body of their own, so
+        # restore() can move them into a new space
+        config = self.config
+        self._fixture_body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        self._fixtures = []
+        for start, end in config.walls():
+            wall = pymunk.Segment(self._fixture_body, start, end, WALL_THICKNESS)
+            wall.elasticity = 0.8
+            wall.friction = 0.5
+            wall.filter = pymunk.ShapeFilter(categories=0b01)
+            wall.collision_type = WALL_COLLISION
+            self._fixtures.append(wall)
+
+        # Pockets: sensors sized so a ball touches one exactly when its centre is
+        # within POCKET_RADIUS. pymunk reports balls entering and leaving them
+        # every substep, so only balls near a pocket cost anything.
+        for i, (x, y, radius) in enumerate(config.pockets):
+            pocket = pymunk.Circle(self._fixture_body, radius - BALL_RADIUS, (x, y))
+            pocket.sensor = True
+            pocket.filter = pymunk.ShapeFilter(categories=POCKET_CATEGORY)
+            pocket.collision_type = POCKET_COLLISION
+            pocket.pocket_index = i
+            self._fixtures.append(pocket)
+        self.space.add(self._fixture_body, *self._fixtures)
+        self.in_pockets = {}    # Ball body -> index of the pocket it is inside
+        self.pot_events = []    # (ball shape, pocket index, tick), potted at the end of the frame
+        self.pocket_vecs = [pymunk.Vec2d(x, y) for x, y, _ in config.pockets]
+        self.in_portals = {}    # Ball body -> portal sensors it overlaps
+
+        self.score = 0
+        self.game_over = self.lost = self.game_won = False
+        self.scratch_reason = ""
+        self.golden_pocket_index = 0
+        self.first_turn = True
+        self.ticks = 0          # Fixed physics ticks played so far
+        self.turn = 0           # Completed turns
+        self.in_motion = False  # A shot is still playing out
+
+        # Hazards
+        self.ice_zone = NO_ZONE
+        self.mud_zone = NO_ZONE
+        self.portals = []        # (a, b) pairs; a ball entering either end comes out of the other
+        self._portal_shapes = []
+        self.warp_cooldowns = {} # Prevents infinite teleport loops
+        self.bumpers = []
+
+        self.impacts = []
+        # Balls in the order they were added to the space, kept in step with it
+        # by add_ball()/remove_ball() so the hot loops never rebuild them
+        self.balls = BallRegistry()
+        self._spare_balls = []  # Potted balls, reused by restore()
+        self._awake, self._awake_stale = [], True   # See awake_bodies()
+        self.cue_ball = self.rack() if rack else None
+
+    # An empty space with the table's physics settings and collision handlers
+    def _new_space(self):
+        space = pymunk.Space()
+        space.gravity = (0, 0)
+        # Resting balls fall asleep and drop out of every per-substep pass until
+        # something hits them; pymunk wakes whole groups of touching balls
+        space.idle_speed_threshold = STOP_SPEED
+        space.sleep_time_threshold = SLEEP_TIME
+
+        space.on_collision(BALL_COLLISION, POCKET_COLLISION, begin=self._on_pocket_enter, separate=self._on_pocket_leave)
+        # Portals are sensors too, so the portal pass only looks at balls touching one
+        space.on_collision(BALL_COLLISION, PORTAL_COLLISION, begin=self._on_portal_enter, separate=self._on_portal_leave)
+        # The only way a step wakes a sleeping ball: something knocks into it
+        space.on_collision(BALL_COLLISION, BALL_COLLISION, begin=self._on_ball_contact)
+
+        # Sound Detection: pymunk's broadphase already finds every contact, so
+        # let it report new ones instead of testing every pair of balls
+        if self.track_impacts:
+            space.on_collision(BALL_COLLISION, BALL_COLLISION, post_solve=self._on_impact, data="ball")
+            space.on_collision(BALL_COLLISION, WALL_COLLISION, post_solve=self._on_impact, data="wall")
+        return space
+
+    # pymunk wakes the ball and everything resting against it after this
+    def _on_ball_contact(self, arbiter, space, data):
+        a, b = arbiter.bodies
+        if a.is_sleeping or b.is_sleeping:
+            self._awake_stale = True
+
+    def _on_impact(self, arbiter, space, kind):
+        # Only the first step of a contact is a hit, not balls resting against each other
+        if arbiter.is_first_contact:
+            impulse = arbiter.total_impulse.length
+            if impulse > IMPACT_THRESHOLDS[kind]:
+                # The ball that was hit: where the sound comes from
+                ball = arbiter.shapes[0].body
+                self.impacts.append((kind, impulse, ball.position.x, ball))
+
+    # A ball that enters a pocket is potted even if it's already out again by
+    # the end of the frame, so fast balls can't skip over a pocket
+    def _on_pocket_enter(self, arbiter, space, data):
+        ball, pocket = arbiter.shapes
+        self.in_pockets[ball.body] = pocket.pocket_index
+        self.pot_events.append((ball, pocket.pocket_index, self.ticks))
+
+    def _on_pocket_leave(self, arbiter, space, data):
+        # The shapes come swapped when the separation is due to a ball being removed
+        ball, pocket = sorted(arbiter.shapes, key=lambda s: s.collision_type)
+        if self.in_pockets.get(ball.body) == pocket.pocket_index:
+            del self.in_pockets[ball.body]
+
+    def _on_portal_enter(self, arbiter, space, data):
+        ball, portal = arbiter.shapes
+        self.in_portals.setdefault(ball.body, []).append(portal)
+
+    def _on_portal_leave(self, arbiter, space, data):
+        ball, portal = sorted(arbiter.shapes, key=lambda s: s.collision_type)
+        touching = self.in_portals.get(ball.body)
+        if touching and portal in touching:
+            touching.remove(portal)
+            if not touching:
+                del self.in_portals[ball.body]
+
+    # The list is shared, not a copy; don't modify it
+    def dynamic_bodies(self):
+        return self.balls.bodies
+
+    # Balls pymunk hasn't put to sleep, in space order. step() drops the ones
+    # that fell asleep; only things that can wake a sleeping ball (a shot, a
+    # ball knocked into one, balls or hazards added or removed) mark the list
+    # stale and cost a pass over every ball. Shared, so don't modify it.
+    def awake_bodies(self):
+        if self._awake_stale:
+            self._awake = [b for b in self.balls.bodies if not b.is_sleeping]
+            self._awake_stale = False
+        return self._awake
+
+    def add_ball(self, pos, color, ball_type):
+        ball = create_pool_ball(self.space, pos, color, ball_type)
+        self.balls.add(ball)
+        self._awake_stale = True
+        return ball.body, ball.shape
+
+    def remove_ball(self, shape):
+        ball = self.balls.of(shape)
+        self.space.remove(shape, ball.body)
+        self.balls.remove(ball)
+        self._awake_stale = True
+        # Nothing may refer to a ball once it's gone (snapshot() indexes them)
+        self.warp_cooldowns.pop(ball.body, None)
+        self.in_portals.pop(ball.body, None)
+        self.in_pockets.pop(ball.body, None)
+        # The record keeps the body alive; shapes only hold a weak reference to it
+        self._spare_balls.append(ball)
+
+    # Clear existing balls and rack a fresh set
+    def rack(self):
+        for ball in list(self.balls):
+            self.remove_ball(ball.shape)
+
+        config = self.config
+        # Create Cue Ball
+        cue_ball, _ = self.add_ball(config.cue_start, (255, 255, 255), CUE)
+
+        # Rack Balls: the 14 coloured balls, repeated for bigger racks
+        colored = [i for i in BALL_COLORS if i != 8]
+        ball_ids = [colored[i % len(colored)] for i in range(config.balls - 1)]
+        self.rng.shuffle(ball_ids)
+
+        # Insert the 8-ball ID at index 4 (the middle of the third column)
+        ball_ids.insert(min(4, len(ball_ids)), 8)
+
+        for current_id, (pos_x, pos_y) in zip(ball_ids, config.rack_spots()):
+            # Assign logic type based on the ID
+            if current_id == 8:
+                b_type = BLACK
+            elif current_id <= 7:
+                b_type = SOLID
+            else:
+                b_type = STRIPE
+
+            color = BALL_COLORS.get(current_id, (200, 200, 200))
+            self.add_ball((pos_x, pos_y), color, b_type)
+        return cue_ball
+
+    # Spawn Bumpers
+    def spawn_hazards(self):
+        if not self.settings["bumpers"]:
+            return
+        space = self.space
+        # Clear old bumpers correctly (pymunk wakes the balls touching them)
+        self._awake_stale = True
+        for b_shape in self.bumpers:
+            if b_shape.body in space.bodies:
+                space.remove(b_shape.body, b_shape)
+        self.bumpers.clear()
+
+        tiers, grids = (BUMPER_SPACED, BUMPER_PACKED), []
+        for _ in range(self.config.bumpers):
+            pos = self._sample_free_space(tiers, grids)
+            if pos is None:
+                break # Packed full
+            self.add_bumper(pos)
+            # Keep the next ones away from this one
+            for tier, grid in zip(tiers, grids):
+                grid.block(*pos, tier["bumper_gap"])
+
+    # A random spot from the first tier with room left. grids holds each
+    # tier's occupancy grid, built the first time it's needed
+    def _sample_free_space(self, tiers, grids, ends=()):
+        for i, tier in enumerate(tiers):
+            if i == len(grids):
+                grids.append(self._free_space(**tier, ends=ends))
+            pos = grids[i].sample(self.rng)
+            if pos is not None:
+                return pos
+        return None
+
+    # Where a hazard's centre may go: margin inside the table and at least the
+    # gaps away from every ball, bumper, pocket and portal end in ends
+    def _free_space(self, margin, ball_gap, bumper_gap, pocket_gap=0, portal_gap=0, ends=()):
+        config = self.config
+        grid = OccupancyGrid(config.left + margin, config.top + margin, config.right - margin, config.bottom - margin)
+        for body in self.dynamic_bodies():
+            grid.block(*body.position, ball_gap)
+        for bumper in self.bumpers:
+            grid.block(*bumper.body.position, bumper_gap)
+        if pocket_gap:
+            for x, y, _ in config.pockets:
+                grid.block(x, y, pocket_gap)
+        for x, y in ends:
+            grid.block(x, y, portal_gap)
+        return grid
+
+    def add_bumper(self, pos):
+        # Create a new body for each bumper
+        b_body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        b_body.position = pos
+        b_shape = pymunk.Circle(b_body, 25)
+        b_shape.elasticity = 1.2
+        b_shape.friction = 0.5
+        # Add a unique filter so they don't catch ghost queries from balls
+        b_shape.filter = pymunk.ShapeFilter(categories=0b100)
+
+        self.space.add(b_body, b_shape)
+        self.bumpers.append(b_shape)
+
+    # Spawn Mud and Ice Zones
+    def spawn_zones(self):
+        if not self.settings["zones"]:
+            return
+        config = self.config
+        safe_L, safe_R = config.left + 100, config.right - 250
+        safe_T, safe_B = config.top + 100, config.bottom - 200
+        if safe_L > safe_R or safe_T > safe_B:
+            # No room for a zone on a table this small; leave them out
+            self.ice_zone = self.mud_zone = NO_ZONE
+            return
+
+        self.ice_zone = (self.rng.randint(safe_L, safe_R), self.rng.randint(safe_T, safe_B), 200, 120)
+        mud_x, mud_y = self.rng.randint(safe_L, safe_R), self.rng.randint(safe_T, safe_B)
+        self.mud_zone = (mud_x, mud_y, 200, 120)
+
+        # Simple check to ensure they don't perfectly overlap
+        if rects_overlap(self.ice_zone, self.mud_zone):
+            self.mud_zone = (mud_x + 200, mud_y, 200, 120) # Shift mud if it hits ice
+
+    # Spawn Portals
+    def spawn_portals(self):
+        if not self.settings["portals"]:
+            return
+
+        tiers, grids = (PORTAL_SPACED, PORTAL_PACKED), []
+        ends, pairs = [], []
+        for _ in range(self.config.portals):
+            pair = []
+            while len(pair) < 2:
+                pos = self._sample_free_space(tiers, grids, ends)
+                if pos is None:
+                    break
+                pair.append(pos)
+                ends.append(pos)
+                for tier, grid in zip(tiers, grids):
+                    grid.block(*pos, tier["portal_gap"])
+            if len(pair) < 2:
+                break # No room for both ends
+            pairs.append(tuple(pair))
+        self.set_portals(pairs)
+
+    # Replace the portals with these (a, b) pairs, sensors included
+    def set_portals(self, pairs):
+        if self._portal_shapes:
+            self.space.remove(*self._portal_shapes)
+            self._awake_stale = True
+        self.in_portals.clear()
+        self.portals = [(pymunk.Vec2d(*map(float, a)), pymunk.Vec2d(*map(float, b))) for a, b in pairs]
+        self._portal_shapes = []
+        for i, (portal_a, portal_b) in enumerate(self.portals):
+            # A ball touching two at once takes the first, a before b
+            for order, (pos, destination) in enumerate([(portal_a, portal_b), (portal_b, portal_a)], 2 * i):
+                portal = pymunk.Circle(self._fixture_body, PORTAL_RADIUS - BALL_RADIUS, pos)
+                portal.sensor = True
+                portal.filter = pymunk.ShapeFilter(categories=PORTAL_CATEGORY)
+                portal.collision_type = PORTAL_COLLISION
+                portal.portal_order = order
+                portal.destination = destination
+                self.space.add(portal)
+                self._portal_shapes.append(portal)
+
+    # Spawn every hazard the settings ask for
+    def spawn_all(self):
+        if self.settings["bumpers"]: self.spawn_hazards()
+        if self.settings["portals"]: self.spawn_portals()
+        if self.settings["zones"]: self.spawn_zones()
+
+    # Plain, picklable description of the table between shots. Worker processes
+    # rebuild an identical table from it with from_layout().
+    def layout(self):
+        return {
+            "settings": dict(self.settings),
+            "balls": [(b.ball_type, b.color, tuple(b.body.position)) for b in self.balls],
+            "bumpers": [tuple(b.body.position) for b in self.bumpers],
+            "portals": [(tuple(a), tuple(b)) for a, b in self.portals],
+            "zones": (self.ice_zone, self.mud_zone),
+            "golden_pocket_index": self.golden_pocket_index,
+            "score": self.score,
+            "config": asdict(self.config),
+        }
+
+    @classmethod
+    def from_layout(cls, layout, **kwargs):
+        config = TableConfig(**layout["config"]) if "config" in layout else None
+        table = cls(**layout["settings"], rack=False, config=config, **kwargs)
+        for b_type, color, pos in layout["balls"]:
+            body, _ = table.add_ball(pos, color, b_type)
+            if b_type == CUE:
+                table.cue_ball = body
+        for pos in layout["bumpers"]:
+            table.add_bumper(pos)
+        table.set_portals(layout["portals"])
+        table.ice_zone, table.mud_zone = layout["zones"]
+        table.golden_pocket_index = layout["golden_pocket_index"]
+        table.score = layout["score"]
+        return table
+
+    # Sleeping balls are at rest by definition, so only the awake ones are
+    # checked; with every ball asleep there are none
+    def balls_stopped(self):
+        return all(b.velocity.length < 5 for b in self.awake_bodies())
+
+    # Called once the balls come to rest: new golden pocket and hazard layout
+    def end_turn(self):
+        self.golden_pocket_index = self.rng.randint(0, len(self.config.pockets) - 1)
+        self.spawn_all()
+
+        if self.first_turn:
+            self.first_turn = False
+        else:
+            self.warp_cooldowns = {}
+        self.turn += 1
+
+    def shoot(self, angle, power):
+        impulse_vec = pymunk.Vec2d(math.cos(angle), math.sin(angle))
+        self.cue_ball.apply_impulse_at_world_point(impulse_vec * (power * 5000), self.cue_ball.position)
+        self.in_motion = True
+        self._awake_stale = True
+
+    # One fixed tick of game time (a frame's worth of physics). Ends the turn on
+    # the tick where a shot's balls come to rest, exactly as the game does.
+    def tick(self):
+        pots = self.step_frame()
+        self.ticks += 1
+        if self.in_motion and self.balls_stopped():
+            self.in_motion = False
+            self.end_turn()
+        return pots
+
+    # Flat copy of the whole game state; see TableSnapshot
+    def snapshot(self):
+        index = {body: i for i, body in enumerate(self.balls.bodies)}
+        balls = array("d")
+        for body in self.balls.bodies:
+            balls.extend((*body.position, *body.velocity, body.angle, body.angular_velocity, *body.force, body.torque))
+        cooldowns = array("d")
+        for body, left in self.warp_cooldowns.items():
+            cooldowns.extend((index[body], left))
+        return TableSnapshot(
+            seed=self.seed,
+            settings=dict(self.settings),
+            config=self.config,
+            balls=balls,
+            ball_types=array("b", [ball.ball_type for ball in self.balls]),
+            colors=tuple(ball.color for ball in self.balls),
+            bumpers=array("d", [v for b in self.bumpers for v in b.body.position]),
+            portals=array("d", [v for pair in self.portals for end in pair for v in end]),
+            cooldowns=cooldowns,
+            zones=(self.ice_zone, self.mud_zone),
+            golden_pocket_index=self.golden_pocket_index,
+            score=self.score,
+            game_over=self.game_over,
+            lost=self.lost,
+            game_won=self.game_won,
+            scratch_reason=self.scratch_reason,
+            first_turn=self.first_turn,
+            ticks=self.ticks,
+            turn=self.turn,
+            in_motion=self.in_motion,
+            rng_state=self.rng.getstate(),
+        )
+
+    # Put the table back in a snapshot's state. The table's own pymunk objects
+    # are moved into a fresh space in the order a new table adds them, so no
+    # contact or sleep state carries over and restoring the same snapshot
+    # always plays out the same. Reusing the old space isn't deterministic:
+    # Chipmunk numbers shapes from a per-space counter (which orders collision
+    # pairs) and keeps contact caches pymunk can't clear. The live game never
+    # does this, so a restored table can drift from the one it was taken of.
+    def restore(self, snapshot):
+        if snapshot.config != self.config:
+            raise ValueError("snapshot is of a table with a different config")
+        # Shapes only hold a weak reference to their body, so keep the bodies
+        # alive while they are out of any space
+        balls = list(self.balls) + self._spare_balls
+        bumpers, self.bumpers = [(b.body, b) for b in self.bumpers], []
+        old = self.space
+        old.remove(*old.shapes)
+        old.remove(*old.bodies)
+        space = self.space = self._new_space()
+        space.add(self._fixture_body, *self._fixtures)
+
+        count = len(snapshot.ball_types)
+        while len(balls) < count:
+            balls.append(create_pool_ball(None, (0, 0), (255, 255, 255), CUE))
+        balls, self._spare_balls = balls[:count], balls[count:]
+        self.balls.clear()
+        self._awake_stale = True
+        self.cue_ball = None
+        state = snapshot.balls
+        for i, ball in enumerate(balls):
+            body = ball.body
+            x, y, vx, vy, angle, spin, fx, fy, torque = state[i * BALL_FIELDS:(i + 1) * BALL_FIELDS]
+            body.position, body.velocity, body.angle, body.angular_velocity = (x, y), (vx, vy), angle, spin
+            body.force, body.torque = (fx, fy), torque
+            # A zero length position update clears the bias velocity pymunk
+            # keeps between steps, which would otherwise leak in from the last use
+            pymunk.Body.update_position(body, 0)
+            ball.ball_type, ball.color = snapshot.ball_types[i], snapshot.colors[i]
+            if ball.ball_type == CUE:
+                self.cue_ball = body
+            space.add(body, ball.shape)
+            self.balls.add(ball)
+
+        positions = snapshot.bumpers
+        for i in range(0, len(positions), 2):
+            pos = (positions[i], positions[i + 1])
+            if bumpers:
+                body, bumper = bumpers.pop(0)
+                body.position = pos
+                space.add(body, bumper)
+                self.bumpers.append(bumper)
+            else:
+                self.add_bumper(pos)
+
+        ends = snapshot.portals
+        pairs = [((ends[i], ends[i + 1]), (ends[i + 2], ends[i + 3])) for i in range(0, len(ends), 4)]
+        if pairs == [(tuple(a), tuple(b)) for a, b in self.portals]:
+            space.add(*self._portal_shapes)
+        else:
+            self._portal_shapes = []
+            self.set_portals(pairs)
+
+        bodies = self.balls.bodies
+        cooldowns = snapshot.cooldowns
+        self.warp_cooldowns = {bodies[int(cooldowns[i])]: cooldowns[i + 1] for i in range(0, len(cooldowns), 2)}
+        self.in_pockets, self.in_portals, self.pot_events = {}, {}, []
+
+        # In place: callers (the settings menu) hold on to this dict
+        self.seed = snapshot.seed
+        self.settings.clear()
+        self.settings.update(snapshot.settings)
+        self.ice_zone, self.mud_zone = snapshot.zones
+        self.golden_pocket_index, self.score = snapshot.golden_pocket_index, snapshot.score
+        self.game_over, self.lost, self.game_won = snapshot.game_over, snapshot.lost, snapshot.game_won
+        self.scratch_reason, self.first_turn = snapshot.scratch_reason, snapshot.first_turn
+        self.ticks, self.turn, self.in_motion = snapshot.ticks, snapshot.turn, snapshot.in_motion
+        self.rng.setstate(snapshot.rng_state)
+
+    # A new table in a snapshot's state
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        table = cls(**snapshot.settings, rack=False, seed=snapshot.seed, config=snapshot.config, **kwargs)
+        table.restore(snapshot)
+        return table
+
+    # One physics substep plus the hazard and suction passes. scale is the
+    # substep's length in fixed substeps, for the per-substep hazard factors.
+    # With sweep set, returns the fastest ball's speed after the substep.
+    def step(self, dt, scale=1, sweep=False):
+        timer = self.timer
+        if timer: timer.start()
+        self.space.step(dt)
+        self.substeps += 1
+        if not self._awake_stale:
+            # Steps are the only time balls fall asleep
+            self._awake = [b for b in self._awake if not b.is_sleeping]
+        bodies = self.awake_bodies()
+        if timer: timer.lap("step")
+        if not bodies:
+            self._decay_warp_cooldowns(scale)
+            return 0.0
+        top_speed = 0.0
+        if sweep:
+            top_speed = self._sweep_pass(bodies, dt)
+            if timer: timer.lap("sweep")
+        if self.vectorized and len(bodies) >= VECTORIZED_MIN_BALLS:
+            self._substep_passes_vectorized(bodies, scale)
+        else:
+            self._substep_passes(bodies, scale)
+        return top_speed
+
+    # Adaptive frame: substeps sized so no ball moves more than ADAPTIVE_TRAVEL
+    # in one, re-split whenever a bounce speeds a ball up mid frame
+    def _step_adaptive(self):
+        remaining = 1 / FPS
+        count = self._substeps_for(self._top_speed(), remaining)
+        if not count:
+            # Everything has settled: the frame passes without a step
+            self._decay_warp_cooldowns(SUBSTEPS)
+            return
+        while count:
+            dt = remaining / count
+            top_speed = self.step(dt, dt * FPS * SUBSTEPS, sweep=True)
+            remaining -= dt
+            count -= 1
+            if count:
+                count = max(count, self._substeps_for(top_speed, remaining))
+
+    def _top_speed(self):
+        bodies = self.awake_bodies()
+        if not bodies:
+            return None
+        return math.sqrt(max(vx * vx + vy * vy for vx, vy in (b.velocity for b in bodies)))
+
+    @staticmethod
+    def _substeps_for(speed, duration):
+        if speed is None:
+            return 0
+        return min(max(math.ceil(speed * duration / ADAPTIVE_TRAVEL), 1), ADAPTIVE_MAX_SUBSTEPS)
+
+    # Continuous check for the adaptive mode: balls that moved far this substep
+    # are traced back along their path, and the first pocket or portal on it
+    # counts as entered even if the sensors never saw the ball touch it.
+    # Returns the fastest ball's speed.
+    def _sweep_pass(self, bodies, dt):
+        top = 0.0
+        for body in bodies:
+            vx, vy = body.velocity
+            speed2 = vx * vx + vy * vy
+            if speed2 > top:
+                top = speed2
+            if speed2 * dt * dt > SWEEP_TRAVEL ** 2:
+                self._sweep(body, vx * dt, vy * dt)
+        return math.sqrt(top)
+
+    def _sweep(self, body, dx, dy):
+        x, y = body.position
+        hits = self.space.segment_query((x - dx, y - dy), (x, y), BALL_RADIUS, SENSOR_FILTER)
+        for hit in sorted(hits, key=lambda h: h.alpha):
+            sensor = hit.shape
+            if sensor.collision_type == POCKET_COLLISION:
+                if body not in self.in_pockets:
+                    shape = next(iter(body.shapes))
+                    self.in_pockets[body] = sensor.pocket_index
+                    self.pot_events.append((shape, sensor.pocket_index, self.ticks))
+                return
+            if body not in self.warp_cooldowns:
+                self._warp(body, sensor)
+                return
+
+    # The hot loops work on plain floats and compare squared distances, so the
+    # common case (no portal, no zone) allocates nothing per ball
+    def _substep_passes(self, bodies, scale=1):
+        timer = self.timer
+
+        self._portal_pass(scale)
+        if timer: timer.lap("portals")
+
+        # Apply Floor Hazards (same bounds as rect_contains)
+        mud, ice = 0.98 ** scale, 1.01 ** scale
+        mx, my, mw, mh = self.mud_zone
+        ix, iy, iw, ih = self.ice_zone
+        mx2, my2, ix2, iy2 = mx + mw, my + mh, ix + iw, iy + ih
+        for body in bodies:
+            x, y = body.position
+
+            # Mud Zone: Heavy resistance. Setting a velocity wakes a ball, so
+            # leave resting ones alone or they never fall asleep
+            if mx <= x < mx2 and my <= y < my2:
+                vx, vy = body.velocity
+                if vx or vy:
+                    body.velocity = (vx * mud, vy * mud)
+
+            # Ice Zone: Low friction
+            elif ix <= x < ix2 and iy <= y < iy2:
+                vx, vy = body.velocity
+                if vx ** 2 + vy ** 2 > 10 ** 2:
+                    body.velocity = (vx * ice, vy * ice)
+        if timer: timer.lap("zones")
+
+        self._suction_pass()
+        if timer: timer.lap("suction")
+
+    # Portal Logic: only the balls the portal sensors reported. They lag a
+    # substep behind balls moved by hand, so the distance is checked again.
+    def _portal_pass(self, scale=1):
+        warp_cooldowns = self.warp_cooldowns
+        for body, touching in self.in_portals.items():
+            # Balls on cooldown can't warp
+            if body in warp_cooldowns or body.is_sleeping:
+                continue
+            x, y = body.position
+            for portal in sorted(touching, key=lambda p: p.portal_order):
+                px, py = portal.offset
+                if (px - x) ** 2 + (py - y) ** 2 < PORTAL_RADIUS ** 2:
+                    break
+            else:
+                continue
+            self._warp(body, portal)
+
+        self._decay_warp_cooldowns(scale)
+
+    def _warp(self, body, portal):
+        # Calculate Ejection Offset
+        # If the ball is nearly still, we'll just push it right/left
+        if body.velocity.length < 10:
+            eject_dir = pymunk.Vec2d(1, 0)
+        else:
+            eject_dir = body.velocity.normalized()
+
+        # Move the ball to the destination plus a 30-pixel push forward
+        body.position = portal.destination + (eject_dir * 30)
+        self.warp_cooldowns[body] = 40 # Prevent instant re-warping
+
+    # Cooldowns count fixed substeps; adaptive substeps take off their length in them
+    def _decay_warp_cooldowns(self, scale=1):
+        warp_cooldowns = self.warp_cooldowns
+        for body in list(warp_cooldowns.keys()):
+            warp_cooldowns[body] -= scale
+            if warp_cooldowns[body] <= 0:
+                del warp_cooldowns[body]
+
+    # Pocket Suction Effect: only the balls currently inside a pocket's sensor
+    def _suction_pass(self):
+        for body, p_idx in self.in_pockets.items():
+            # Apply a small force toward the center of the pocket
+            force_dir = (self.pocket_vecs[p_idx] - body.position).normalized()
+            body.apply_force_at_world_point(force_dir * 500, body.position)
+
+    # One rendered frame worth of physics: substeps, pocketing, rules and friction.
+    # Returns the (ball_type, pocket_index) of every ball potted this frame.
+    # Without iterations an adaptive table picks its own substeps, which
+    # together always span one frame of game time.
+    def step_frame(self, iterations=None):
+        timer = self.timer
+        if iterations is None and self.adaptive:
+            self._step_adaptive()
+            iterations = SUBSTEPS # Friction per frame stays that of the fixed step
+        else:
+            iterations = iterations or SUBSTEPS
+            dt = (1/FPS) / SUBSTEPS
+            for _ in range(iterations):
+                self.step(dt)
+        if timer: timer.start()
+
+        # Scoring/Flagging Balls that entered pockets during the substeps
+        cue_potted = False
+        black_potted = False
+        pots = []
+        potted = set()
+        events, self.pot_events = self.pot_events, []
+        for shape, p_idx, _ in events:
+            if shape in potted:
+                continue
+            potted.add(shape)
+            self.in_pockets.pop(shape.body, None)
+
+            b_type = self.balls.of(shape).ball_type
+            points = 0
+            pots.append((b_type, p_idx))
+
+            if b_type == CUE:
+                # Cue Ball - Scratch Logic: respot it instead of removing it
+                points = -50
+                cue_potted = True
+                shape.body.position, shape.body.velocity = self.config.cue_start, (0, 0)
+            if b_type == SOLID or b_type == STRIPE:
+                # Object Ball Scoring
+                points = 100
+
+                if p_idx == self.golden_pocket_index:
+                    points *= 2 # Double points for golden pocket
+
+            if b_type == BLACK:
+                black_potted = True
+                points = 500
+
+            self.score += points
+            # Remove object balls from play
+            if b_type != CUE:
+                self.remove_ball(shape)
+
+        if timer: timer.lap("pocketing")
+
+        # Evaluate Win/Loss conditions
+        if black_potted or cue_potted:
+            remaining_standard = self.balls.count(SOLID, STRIPE)
+
+            if black_potted:
+                if cue_potted:
+                    self.game_over = self.lost = True
+                    self.scratch_reason = "SCRATCH ON 8-BALL!"
+                elif remaining_standard > 0:
+                    self.game_over = self.lost = True
+                    self.scratch_reason = "8-BALL POTTED TOO EARLY!"
+                else:
+                    self.game_over = True
+                    self.lost = False
+                    self.game_won = True
+
+            elif cue_potted:
+                # Normal scratch logic
+                if not remaining_standard and not self.balls.count(BLACK):
+                    self.game_over = self.lost = True
+                    self.scratch_reason = "SCRATCH ON FINAL TARGET!"
+
+        if timer: timer.lap("rules")
+
+        if self.vectorized and len(self.awake_bodies()) >= VECTORIZED_MIN_BALLS:
+            self._friction_pass_vectorized(iterations)
+        else:
+            self._friction_pass(iterations)
+        if timer: timer.lap("friction")
+
+        return pots
+
+    # Each ball's velocity is read and written once; the factors are applied
+    # one after the other, exactly as separate passes would
+    def _friction_pass(self, iterations):
+        substep_damping = math.pow(FRICTION, 1/iterations)
+        for body in self.awake_bodies():
+            vx, vy = body.velocity
+
+            # Velocity Clamping & Friction
+            if vx ** 2 + vy ** 2 > MAX_SPEED ** 2:
+                vx, vy = body.velocity.normalized() * MAX_SPEED
+            vx, vy = vx * substep_damping, vy * substep_damping
+
+            # Apply standard friction
+            vx, vy = vx * FRAME_DAMPING, vy * FRAME_DAMPING
+
+            # Hard Stop Threshold
+            # If the ball is moving slower than 13 pixels per second, kill its momentum
+            if vx ** 2 + vy ** 2 < STOP_SPEED ** 2:
+                body.velocity = (0, 0)
+                body.angular_velocity = 0
+            else:
+                body.velocity = (vx, vy)
+                body.angular_velocity *= 0.99  # Also slow down the rotation
+
+    # Same passes as _substep_passes, but positions and velocities are copied
+    # out of pymunk in one call, the zones are evaluated as batched ops and
+    # only the bodies in a zone are written back. The portal and suction
+    # passes only touch the few balls their sensors report, no arrays needed.
+    def _substep_passes_vectorized(self, bodies, scale=1):
+        timer = self.timer
+        self._portal_pass(scale)
+        if timer: timer.lap("portals")
+
+        # The zones are the only per-ball work left; without any, skip the gather
+        if self.mud_zone != NO_ZONE or self.ice_zone != NO_ZONE:
+            self._zone_pass_vectorized(len(bodies), scale)
+
+        self._suction_pass()
+        if timer: timer.lap("suction")
+
+    # Body state for the first `count` bodies pymunk iterates, `width` floats
+    # each, with their ids. Awake dynamic bodies come first, and on this table
+    # those are exactly the awake balls.
+    def _gather(self, fields, count, width):
+        buf = self._batch
+        buf.clear()
+        pymunk.batch.get_space_bodies(self.space, fields, buf)
+        state = np.frombuffer(buf.float_buf(), dtype=float, count=count * width).reshape(count, width)
+        ids = np.frombuffer(buf.int_buf(), dtype=np.uintp, count=count)
+        return state, ids
+
+    def _zone_pass_vectorized(self, count, scale):
+        timer = self.timer
+        state, ids = self._gather(ZONE_FIELDS, count, 4)
+        if timer: timer.lap("gather")
+
+        # Apply Floor Hazards: both zones tested at once, (x, y) against
+        # [left, right) x [top, bottom), mud first
+        zones = (self.mud_zone, self.ice_zone)
+        if self._zone_bounds[0] != zones:
+            self._zone_bounds = zones, np.array([z[:2] for z in zones], dtype=float), \
+                                np.array([(x + w, y + h) for x, y, w, h in zones], dtype=float)
+        _, low, high = self._zone_bounds
+        pos, vel = state[:, None, :2], state[:, 2:]
+        inside = ((pos >= low) & (pos < high)).all(axis=2)
+        speed2 = (vel * vel).sum(axis=1)
+        in_mud = inside[:, 0] & (vel != 0).any(axis=1)
+        in_ice = inside[:, 1] & ~inside[:, 0] & (speed2 > 10 ** 2)
+        changed = np.nonzero(in_mud | in_ice)[0]
+        if not len(changed):
+            if timer: timer.lap("zones")
+            return
+        factor = np.where(in_mud[changed], 0.98 ** scale, 1.01 ** scale)
+        vel = vel[changed] * factor[:, None]
+        if timer: timer.lap("zones")
+
+        # Only the balls in a zone are written back
+        by_id = self.balls.by_id
+        for body_id, v in zip(ids[changed].tolist(), vel.tolist()):
+            by_id[body_id].velocity = tuple(v)
+        if timer: timer.lap("writeback")
+
+    def _friction_pass_vectorized(self, iterations):
+        count = len(self.awake_bodies())
+        if not count:
+            return
+        state, ids = self._gather(FRICTION_FIELDS, count, 3)
+        vel, spin = state[:, :2].copy(), state[:, 2].copy()
+
+        # Velocity Clamping & Friction, rounded exactly as _friction_pass does
+        speed2 = (vel * vel).sum(axis=1)
+        too_fast = speed2 > MAX_SPEED ** 2
+        if too_fast.any():
+            vel[too_fast] = vel[too_fast] / np.sqrt(speed2[too_fast])[:, None] * MAX_SPEED
+        vel *= math.pow(FRICTION, 1/iterations)
+        vel *= FRAME_DAMPING
+        spin *= 0.99
+
+        # Hard Stop Threshold
+        stopped = (vel * vel).sum(axis=1) < STOP_SPEED ** 2
+        vel[stopped] = 0.0
+        spin[stopped] = 0.0
+
+        by_id = self.balls.by_id
+        for body_id, v, w in zip(ids.tolist(), vel.tolist(), spin.tolist()):
+            body = by_id[body_id]
+            body.velocity = tuple(v)
+            body.angular_velocity = w
+
+    # Shoot and run the physics uncapped until every ball is at rest. With
+    # end_turn the table also rolls the next turn's hazards, like tick() does.
+    def simulate_shot(self, angle, power, max_frames=MAX_SHOT_FRAMES, end_turn=False):
+        outcome = ShotOutcome()
+        start_score = self.score
+        self.shoot(angle, power)
+
+        while outcome.frames < max_frames:
+            for b_type, p_idx in self.step_frame():
+                outcome.pots.append((b_type, p_idx))
+                if b_type == CUE:
+                    outcome.scratch = True
+            outcome.frames += 1
+            self.ticks += 1
+            if self.game_over:
+                break
+            if self.balls_stopped():
+                self.in_motion = False
+                if end_turn:
+                    self.end_turn()
+                break
+
+        outcome.score_delta = self.score - start_score
+        outcome.game_over = self.game_over
+        outcome.lost = self.lost
+        outcome.game_won = self.game_won
+        outcome.scratch_reason = self.scratch_reason
+        outcome.final_positions = [
+            (b.ball_type, b.body.position.x, b.body.position.y)
+            for b in self.balls
+        ]
+        return outcome
+
+
+def simulate_shot(angle, power, table=None):
+    # Convenience wrapper: run one shot on a fresh (or supplied) table
+    if table is None:
+        table = Table()
+    return table.simulate_shot(angle, power)
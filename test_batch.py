@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# The default command, every hazard on: seed 0 has a ball that never stops on
+# the ice, which has to end the game rather than the run
+def test_simulate_cli_streams_every_game(tmp_path):
+    out = tmp_path / "games.jsonl"
+    subprocess.run([sys.executable, os.path.join(HERE, "pool.py"), "simulate", "--games", "2", "--workers", "1",
+                    "--output", str(out)], check=True, timeout=120, capture_output=True)
+    games = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [g["seed"] for g in games] == [0, 1]
+    assert all(g["hazards"] == "zones+portals+bumpers" for g in games)
+    assert games[0]["reason"] == "STALLED" and not games[0]["finished"]
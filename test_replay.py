@@ -0,0 +1,23 @@
+from batch import play_games
+from replay import Replay
+from simulation import CUE, TableConfig
+
+SETTINGS = {"zones": True, "portals": True, "bumpers": True}
+
+
+def test_bytes_round_trip():
+    replay = Replay(7, SETTINGS, [(0, 0.25, 0.8), (412, -1.5, 0.33)], config=TableConfig(balls=21, portals=2))
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert (loaded.seed, loaded.settings, loaded.shots, loaded.config) == \
+           (replay.seed, replay.settings, replay.shots, replay.config)
+
+
+# Seed 0 ends on a shot that never comes to rest, seed 1 on the 8-ball
+def test_play_matches_batch():
+    for result in play_games([(0, SETTINGS), (1, SETTINGS)], max_shots=12):
+        table = Replay.from_bytes(result.replay().to_bytes()).play()
+        assert (table.score, table.ticks, table.game_over) == (result.score, result.ticks, result.finished)
+        stalled = table.in_motion and not table.game_over
+        assert result.reason == ("STALLED" if stalled else table.scratch_reason)
+        potted = sum(b_type != CUE for b_type, _ in result.pots)
+        assert len(table.balls) == 1 + TableConfig().balls - potted
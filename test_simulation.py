@@ -0,0 +1,30 @@
+from simulation import NO_ZONE, SOLID, Table, TableConfig
+
+
+# A ball warps out next to the top right pocket and drops in while its warp
+# cooldown is still running
+def test_snapshot_after_potting_a_warped_ball():
+    table = Table(seed=1, zones=False, portals=False, bumpers=False, rack=False)
+    table.set_portals([((600, 325), (1100, 75))])
+    body, _ = table.add_ball((560, 325), (255, 0, 0), SOLID)
+    body.velocity = (800, -400)
+    table.in_motion = True
+
+    pots = []
+    while not pots:
+        pots = table.step_frame()
+    assert pots == [(SOLID, 2)]
+    assert not table.warp_cooldowns
+
+    snapshot = table.snapshot()
+    table.restore(snapshot)
+    assert len(table.balls) == 0
+
+
+# Too small for the hazard zones, which get left out rather than placed
+def test_small_table_spawns_without_zones():
+    config = TableConfig(left=50, right=380, top=50, bottom=300, cue_start=(100, 175), rack_spot=(250, 175), balls=3)
+    table = Table(config=config, seed=1)
+    table.spawn_all()
+    assert table.ice_zone == table.mud_zone == NO_ZONE
+    assert len(table.balls) == 4